@@ -1,11 +1,22 @@
 from django.contrib import admin
 from .models import StaffProfile, Chunk, CrawlUrl, Faculty, Institute, Department
+from .pagestore import load_profile_html
 
 
 @admin.register(StaffProfile)
 class StaffProfileAdmin(admin.ModelAdmin):
     list_display = ("name", "title", "faculty", "institute", "department", "updated_at")
     search_fields = ("name", "faculty__name", "institute__name", "department__name")
+    exclude = ("raw_html",)
+    readonly_fields = ("raw_html_hash", "stored_html")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer("raw_html")
+
+    @admin.display(description="Stored HTML")
+    def stored_html(self, obj):
+        # Decompressed only on the change page, never for the changelist.
+        return load_profile_html(obj) if obj.pk else ""
 
 
 @admin.register(Faculty)
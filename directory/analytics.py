@@ -0,0 +1,129 @@
+import json
+import logging
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import get_redis
+from .models import ChatLog, SearchLog
+
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "staffsearch:analytics"
+MODELS = {"search": SearchLog, "chat": ChatLog}
+
+# Append unless the buffer is full, in which case count the drop instead.
+PUSH_SCRIPT = """
+if redis.call('LLEN', KEYS[1]) >= tonumber(ARGV[2]) then
+    redis.call('INCR', KEYS[2])
+    return 0
+end
+redis.call('RPUSH', KEYS[1], ARGV[1])
+return 1
+"""
+
+_push_script = None
+
+
+def _buffer_key(kind):
+    return f"{PREFIX}:{kind}"
+
+
+def _dropped_key(kind):
+    return f"{PREFIX}:{kind}:dropped"
+
+
+def _record(kind, fields):
+    global _push_script
+    fields["created_at"] = timezone.now().isoformat()
+    try:
+        if _push_script is None:
+            _push_script = get_redis().register_script(PUSH_SCRIPT)
+        _push_script(
+            keys=[_buffer_key(kind), _dropped_key(kind)],
+            args=[json.dumps(fields), settings.ANALYTICS_BUFFER_MAX],
+        )
+    except redis.RedisError as exc:
+        # Without the buffer, fall back to writing the row on the request path.
+        logger.warning("Analytics buffer unavailable, writing %s log directly: %s", kind, exc)
+        MODELS[kind].objects.create(**_row_fields(fields))
+
+
+def _row_fields(fields):
+    fields = dict(fields)
+    fields["created_at"] = parse_datetime(fields["created_at"])
+    return fields
+
+
+def request_fields(request):
+    return {
+        "user_id": request.user.id if request.user.is_authenticated else None,
+        "ip_address": request.META.get("REMOTE_ADDR"),
+        "user_agent": request.META.get("HTTP_USER_AGENT", ""),
+    }
+
+
+def record_search(request, **fields):
+    _record("search", {**request_fields(request), **fields})
+
+
+def record_chat(request, **fields):
+    _record("chat", {**request_fields(request), **fields})
+
+
+def flush(kind, batch_size=500):
+    """Move up to ``batch_size`` buffered records of one kind into the database."""
+    client = get_redis()
+    raw = client.lpop(_buffer_key(kind), batch_size) or []
+    if not raw:
+        return 0
+    model = MODELS[kind]
+    rows = [model(**_row_fields(json.loads(item))) for item in raw]
+    try:
+        try:
+            model.objects.bulk_create(rows, batch_size=batch_size)
+        except IntegrityError:
+            # A user deleted since the request was logged; keep their records anonymously.
+            user_ids = {row.user_id for row in rows if row.user_id is not None}
+            existing = set(get_user_model().objects.filter(id__in=user_ids).values_list("id", flat=True))
+            for row in rows:
+                row.pk = None
+                if row.user_id not in existing:
+                    row.user_id = None
+            model.objects.bulk_create(rows, batch_size=batch_size)
+    except Exception:
+        client.lpush(_buffer_key(kind), *reversed(raw))
+        raise
+    return len(rows)
+
+
+def flush_all(batch_size=500, max_batches=20):
+    written = {}
+    for kind in MODELS:
+        total = 0
+        for _ in range(max_batches):
+            count = flush(kind, batch_size=batch_size)
+            total += count
+            if count < batch_size:
+                break
+        written[kind] = total
+    return written
+
+
+def buffer_stats():
+    stats = {}
+    try:
+        client = get_redis()
+        for kind in MODELS:
+            stats[kind] = {
+                "buffered": client.llen(_buffer_key(kind)),
+                "dropped": int(client.get(_dropped_key(kind)) or 0),
+            }
+    except redis.RedisError:
+        return None
+    return stats
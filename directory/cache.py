@@ -0,0 +1,228 @@
+import json
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+from .utils import clean_text, hash_text
+
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+    return _redis_client
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def normalize_query(text):
+    return clean_text(text).casefold()
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache for query embeddings.
+
+    Tier one is a per-process LRU. Tier two is shared through Redis: each
+    vector lives under its own key with a TTL, and a sorted set of keys by
+    last write time lets us evict the oldest entries once ``max_entries`` is
+    exceeded. Redis failures degrade to a miss rather than an error.
+    """
+
+    prefix = "staffsearch:qemb"
+
+    # Shared counters are pushed to Redis after this many lookups or seconds, never per lookup.
+    stats_flush_every = 100
+    stats_flush_seconds = 30.0
+
+    def __init__(self, maxsize=1024, ttl=60 * 60 * 24 * 7, max_entries=50000):
+        self.memory = LRUCache(maxsize=maxsize)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.counters = {"memory_hits": 0, "redis_hits": 0, "misses": 0}
+        self._unflushed = dict.fromkeys(self.counters, 0)
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def key(self, query_text, model):
+        return f"{self.prefix}:{model}:{hash_text(normalize_query(query_text))}"
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+            self._unflushed[name] += 1
+            due = (
+                sum(self._unflushed.values()) >= self.stats_flush_every
+                or time.monotonic() - self._flushed_at >= self.stats_flush_seconds
+            )
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add this process's counts since the last flush to the shared Redis counters."""
+        with self._lock:
+            deltas = {name: value for name, value in self._unflushed.items() if value}
+            self._unflushed = dict.fromkeys(self.counters, 0)
+            self._flushed_at = time.monotonic()
+        if not deltas:
+            return
+        try:
+            pipe = get_redis().pipeline()
+            for name, value in deltas.items():
+                pipe.hincrby(f"{self.prefix}:stats", name, value)
+            pipe.execute()
+        except redis.RedisError:
+            pass
+
+    def get(self, query_text, model):
+        key = self.key(query_text, model)
+        embedding = self.memory.get(key)
+        if embedding is not None:
+            self._count("memory_hits")
+            return embedding
+
+        try:
+            raw = get_redis().get(key)
+        except redis.RedisError as exc:
+            logger.warning("Query embedding cache unavailable: %s", exc)
+            raw = None
+        if raw is not None:
+            embedding = array("f", raw).tolist()
+            self.memory.set(key, embedding)
+            self._count("redis_hits")
+            return embedding
+
+        self._count("misses")
+        return None
+
+    def set(self, query_text, model, embedding):
+        key = self.key(query_text, model)
+        self.memory.set(key, list(embedding))
+        index_key = f"{self.prefix}:index"
+        try:
+            client = get_redis()
+            pipe = client.pipeline()
+            pipe.set(key, array("f", embedding).tobytes(), ex=self.ttl)
+            pipe.zadd(index_key, {key: time.time()})
+            pipe.zremrangebyscore(index_key, "-inf", time.time() - self.ttl)
+            pipe.zcard(index_key)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                evicted = [member for member, _ in client.zpopmin(index_key, size - self.max_entries)]
+                if evicted:
+                    client.delete(*evicted)
+        except redis.RedisError as exc:
+            logger.warning("Query embedding cache unavailable: %s", exc)
+
+    def get_or_embed(self, query_text, model, embed):
+        embedding = self.get(query_text, model)
+        if embedding is None:
+            embedding = embed([query_text])[0]
+            self.set(query_text, model, embedding)
+        return embedding
+
+    def stats(self):
+        self.flush_stats()
+        with self._lock:
+            local = dict(self.counters)
+        shared = {}
+        try:
+            shared = {k.decode(): int(v) for k, v in get_redis().hgetall(f"{self.prefix}:stats").items()}
+        except redis.RedisError:
+            pass
+        totals = {name: shared.get(name, local[name]) for name in local}
+        lookups = sum(totals.values())
+        hits = totals["memory_hits"] + totals["redis_hits"]
+        return {
+            **totals,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_size": len(self.memory),
+            "process": local,
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    maxsize=settings.QUERY_EMBED_CACHE_SIZE,
+    ttl=settings.QUERY_EMBED_CACHE_TTL,
+    max_entries=settings.QUERY_EMBED_CACHE_MAX_ENTRIES,
+)
+
+
+def chat_answer_key(question, filters, chunks, mode="json"):
+    """Key a chat answer on the question, filters, the exact retrieved chunks and the response mode.
+
+    Including each chunk's content hash means the key changes as soon as a
+    re-embedded profile produces different chunks, so stale answers are
+    never served. Streamed ("stream") and JSON ("json") answers come from
+    different prompts and payloads, so each mode only sees its own.
+    """
+    material = json.dumps(
+        {
+            "question": normalize_query(question),
+            "filters": {k: normalize_query(str(v)) for k, v in sorted((filters or {}).items()) if v},
+            "chunks": [[chunk.id, chunk.content_hash] for chunk in chunks],
+            "model": settings.OPENAI_CHAT_MODEL,
+            "mode": mode,
+        },
+        sort_keys=True,
+    )
+    return f"staffsearch:chat:{hash_text(material)}"
+
+
+def get_chat_answer(key):
+    try:
+        return cache.get(key)
+    except redis.RedisError as exc:
+        logger.warning("Chat answer cache unavailable: %s", exc)
+        return None
+
+
+def set_chat_answer(key, payload):
+    try:
+        cache.set(key, payload, timeout=settings.CHAT_ANSWER_CACHE_TTL)
+    except redis.RedisError as exc:
+        logger.warning("Chat answer cache unavailable: %s", exc)
@@ -1,9 +1,13 @@
 import json
+import os
 import re
+import threading
+from functools import cached_property
 from urllib.parse import urljoin, urlparse, urlunparse
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, NavigableString, Tag
 
 from .utils import clean_text, split_name_title_suffix
 
@@ -72,26 +76,80 @@ def should_skip_url(url):
     return False
 
 
-def extract_links(html, base_url):
-    soup = BeautifulSoup(html, "lxml")
-    links = set()
-    for a in soup.find_all("a", href=True):
-        href = a.get("href")
-        if href and not href.startswith("mailto:") and not href.startswith("tel:"):
-            links.add(urljoin(base_url, href))
-    return links
+TEXT_EXCLUDED_TAGS = frozenset(["script", "style", "noscript", "header", "footer", "nav", "aside"])
 
 
-def extract_text_content(html):
-    soup = BeautifulSoup(html, "lxml")
-    for tag in soup(["script", "style", "noscript", "header", "footer", "nav", "aside"]):
-        tag.decompose()
+def _is_excluded(tag):
+    return tag.name in TEXT_EXCLUDED_TAGS or any(parent.name in TEXT_EXCLUDED_TAGS for parent in tag.parents)
+
+
+def _visible_strings(root):
+    # Same strings as root.get_text(strip=True) would give after decomposing
+    # TEXT_EXCLUDED_TAGS, but without mutating the shared tree.
+    types = root.interesting_string_types
+    stack = [iter(root.contents)]
+    while stack:
+        for child in stack[-1]:
+            if isinstance(child, Tag):
+                if child.name in TEXT_EXCLUDED_TAGS:
+                    continue
+                stack.append(iter(child.contents))
+                break
+            if isinstance(child, NavigableString) and type(child) in types:
+                text = child.strip()
+                if text:
+                    yield text
+        else:
+            stack.pop()
+
+
+class ParsedPage:
+    """A fetched page parsed once.
+
+    Links, text content and staff fields are derived lazily from the same
+    tree, so callers that need several of them only pay for one parse.
+    """
+
+    def __init__(self, html, base_url=""):
+        self.html = html
+        self.base_url = base_url
+
+    @cached_property
+    def soup(self):
+        return BeautifulSoup(self.html, "lxml")
+
+    @cached_property
+    def links(self):
+        links = set()
+        for a in self.soup.find_all("a", href=True):
+            href = a.get("href")
+            if href and not href.startswith("mailto:") and not href.startswith("tel:"):
+                links.add(urljoin(self.base_url, href))
+        return links
+
+    @cached_property
+    def text_content(self):
+        soup = self.soup
+        title_tag = next((t for t in soup.find_all("title") if not _is_excluded(t)), None)
+        title = title_tag.get_text(" ", strip=True) if title_tag else ""
+        headings = " ".join(
+            h.get_text(" ", strip=True) for h in soup.find_all(["h1", "h2", "h3"]) if not _is_excluded(h)
+        )
+        body = " ".join(_visible_strings(soup))
+
+        return clean_text(" ".join([title, headings, body]))
+
+    @cached_property
+    def staff_fields(self):
+        return _extract_staff_fields(self.soup, self.base_url)
 
-    title = soup.title.get_text(" ", strip=True) if soup.title else ""
-    headings = " ".join(h.get_text(" ", strip=True) for h in soup.find_all(["h1", "h2", "h3"]))
-    body = soup.get_text(" ", strip=True)
 
-    return clean_text(" ".join([title, headings, body]))
+def extract_links(html, base_url):
+    return ParsedPage(html, base_url).links
+
+
+def extract_text_content(html):
+    return ParsedPage(html).text_content
 
 
 def extract_labeled_fields(soup, label):
@@ -109,7 +167,10 @@ def extract_labeled_fields(soup, label):
 
 
 def extract_staff_fields(html, base_url=""):
-    soup = BeautifulSoup(html, "lxml")
+    return ParsedPage(html, base_url).staff_fields
+
+
+def _extract_staff_fields(soup, base_url=""):
     name_text = ""
     h1 = soup.find("h1")
     if h1:
@@ -237,12 +298,39 @@ def extract_staff_fields(html, base_url=""):
     }
 
 
-def fetch_url(url, etag=None, last_modified=None, timeout=20):
+_sessions = threading.local()
+
+
+def get_session(pool_size=10):
+    """Return this process's keep-alive session, creating it after a fork."""
+    session = getattr(_sessions, "session", None)
+    if session is None or _sessions.pid != os.getpid():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        _sessions.session = session
+        _sessions.pid = os.getpid()
+    return session
+
+
+def request_headers(etag=None, last_modified=None):
     headers = {"User-Agent": USER_AGENT}
     if etag:
         headers["If-None-Match"] = etag
     if last_modified:
         headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def parse_links(html, base_url):
+    """Picklable entry point for parsing a page's links in a worker process."""
+    return sorted(ParsedPage(html, base_url).links)
+
 
-    response = requests.get(url, headers=headers, timeout=timeout)
+def fetch_url(url, etag=None, last_modified=None, timeout=20, session=None):
+    headers = request_headers(etag, last_modified)
+    session = session or get_session()
+    response = session.get(url, headers=headers, timeout=timeout)
     return response
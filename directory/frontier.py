@@ -0,0 +1,330 @@
+import hashlib
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone
+
+import redis
+from django.conf import settings
+from django.db import connection
+
+from .cache import get_redis
+from .models import CrawlUrl
+
+
+logger = logging.getLogger(__name__)
+
+CRAWL_OUTCOME_FIELDS = [
+    "status",
+    "http_status",
+    "etag",
+    "last_modified",
+    "content_hash",
+    "last_fetched_at",
+    "next_fetch_at",
+    "change_interval",
+    "lease_owner",
+    "lease_expires_at",
+    "error",
+]
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_crawl_urls(limit, owner=None, lease_seconds=None):
+    """Lease up to ``limit`` queued URLs in a single UPDATE ... RETURNING statement.
+
+    The lease is held in the database until the outcome is written back; if
+    the worker dies first, reap_expired_leases returns the URL to the queue.
+    """
+    owner = owner or worker_id()
+    lease_seconds = lease_seconds or settings.CRAWL_LEASE_SECONDS
+    fields = CrawlUrl._meta.concrete_fields
+    table = connection.ops.quote_name(CrawlUrl._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    sql = (
+        f"UPDATE {table} SET status = %s, lease_owner = %s, "
+        f"lease_expires_at = now() + make_interval(secs => %s) "
+        f"WHERE id IN ("
+        f"SELECT id FROM {table} WHERE status = %s "
+        f"ORDER BY priority DESC, id LIMIT %s FOR UPDATE SKIP LOCKED"
+        f") RETURNING {columns}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, ["leased", owner, lease_seconds, "queued", limit])
+        rows = cursor.fetchall()
+    names = [f.attname for f in fields]
+    url_objs = [CrawlUrl.from_db(connection.alias, names, row) for row in rows]
+    for url_obj in url_objs:
+        # Cleared in memory only, so writing the outcome releases the lease.
+        url_obj.lease_owner = ""
+        url_obj.lease_expires_at = None
+    url_objs.sort(key=lambda u: (-u.priority, u.id))
+    return url_objs
+
+
+def reap_expired_leases():
+    """Return URLs whose lease ran out (the worker died or hung) to the queue."""
+    return CrawlUrl.objects.filter(status="leased", lease_expires_at__lt=datetime.now(timezone.utc)).update(
+        status="queued",
+        lease_owner="",
+        lease_expires_at=None,
+    )
+
+
+def insert_new_urls(url_objs):
+    """INSERT ... ON CONFLICT DO NOTHING and return the URLs that were actually new."""
+    if not url_objs:
+        return set()
+    fields = [f for f in CrawlUrl._meta.concrete_fields if not f.primary_key]
+    table = connection.ops.quote_name(CrawlUrl._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    row_sql = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    params = []
+    for url_obj in url_objs:
+        params.extend(f.get_db_prep_save(getattr(url_obj, f.attname), connection) for f in fields)
+    sql = (
+        f"INSERT INTO {table} ({columns}) VALUES {', '.join([row_sql] * len(url_objs))} "
+        f"ON CONFLICT (url) DO NOTHING RETURNING url"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+class DatabaseFrontier:
+    """The CrawlUrl table is both the record and the work queue."""
+
+    name = "database"
+
+    def add(self, url_objs):
+        """Insert unseen URLs as queued. Returns (known, inserted)."""
+        by_url = {url_obj.url: url_obj for url_obj in url_objs}
+        if not by_url:
+            return 0, 0
+        existing = set(CrawlUrl.objects.filter(url__in=list(by_url)).values_list("url", flat=True))
+        new_urls = [url_obj for url, url_obj in by_url.items() if url not in existing]
+        CrawlUrl.objects.bulk_create(new_urls, ignore_conflicts=True)
+        return len(existing), len(new_urls)
+
+    def claim(self, limit, owner=None, lease_seconds=None):
+        return claim_crawl_urls(limit, owner=owner, lease_seconds=lease_seconds)
+
+    def resume(self, ids, owner=None):
+        """Reload claimed URLs whose lease is still held, e.g. fetches booked for later."""
+        url_objs = CrawlUrl.objects.filter(id__in=ids, status="leased")
+        if owner:
+            url_objs = url_objs.filter(lease_owner=owner)
+        url_objs = list(url_objs)
+        for url_obj in url_objs:
+            url_obj.lease_owner = ""
+            url_obj.lease_expires_at = None
+        return url_objs
+
+    def complete(self, url_objs):
+        CrawlUrl.objects.bulk_update(url_objs, CRAWL_OUTCOME_FIELDS)
+
+    def reap(self):
+        return reap_expired_leases()
+
+    def sync(self):
+        return 0
+
+    def has_work(self):
+        return CrawlUrl.objects.filter(status="queued").exists()
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+# Pop the highest-scored URLs and lease them, remembering each score for a requeue.
+CLAIM_SCRIPT = """
+local items = redis.call('ZPOPMAX', KEYS[1], ARGV[1])
+local urls = {}
+for i = 1, #items, 2 do
+    redis.call('ZADD', KEYS[2], ARGV[2], items[i])
+    redis.call('HSET', KEYS[3], items[i], items[i + 1])
+    table.insert(urls, items[i])
+end
+return urls
+"""
+
+# Put expired leases back on the queue with their original score.
+REAP_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, url in ipairs(expired) do
+    local score = redis.call('HGET', KEYS[3], url) or '0'
+    redis.call('ZADD', KEYS[1], 'NX', score, url)
+    redis.call('ZREM', KEYS[2], url)
+    redis.call('HDEL', KEYS[3], url)
+end
+return #expired
+"""
+
+# Queue URLs the database marks as queued unless a worker currently holds them.
+SYNC_SCRIPT = """
+local added = 0
+for i = 1, #ARGV, 2 do
+    local url = ARGV[i + 1]
+    if not redis.call('ZSCORE', KEYS[2], url) then
+        added = added + redis.call('ZADD', KEYS[1], 'NX', ARGV[i], url)
+    end
+end
+return added
+"""
+
+
+class RedisFrontier:
+    """Work queue in Redis; CrawlUrl stays the permanent record.
+
+    Queued URLs live in a sorted set scored by priority and depth, so a claim
+    is a ZPOPMAX whatever the size of the URL table. A set of URL digests
+    answers "have we seen this link" without a database query. Claims never
+    touch the database; outcomes are written back a batch at a time.
+    """
+
+    name = "redis"
+    prefix = "staffsearch:frontier"
+
+    def __init__(self, client=None):
+        self._client = client
+        self._scripts = {}
+        self.queue_key = f"{self.prefix}:queue"
+        self.lease_key = f"{self.prefix}:leases"
+        self.score_key = f"{self.prefix}:scores"
+        self.seen_key = f"{self.prefix}:seen"
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    def _script(self, name, source):
+        if name not in self._scripts:
+            self._scripts[name] = self.client.register_script(source)
+        return self._scripts[name]
+
+    @staticmethod
+    def score(url_obj):
+        return url_obj.priority * 100 - min(url_obj.depth, 99)
+
+    @staticmethod
+    def digest(url):
+        return hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+
+    def add(self, url_objs):
+        by_url = {url_obj.url: url_obj for url_obj in url_objs}
+        if not by_url:
+            return 0, 0
+        pipe = self.client.pipeline()
+        for url in by_url:
+            pipe.sadd(self.seen_key, self.digest(url))
+        unseen = [url_obj for url_obj, added in zip(by_url.values(), pipe.execute()) if added]
+        # The digest set can be younger than the table, so the insert has the final say.
+        inserted = insert_new_urls(unseen)
+        if inserted:
+            self.client.zadd(self.queue_key, {url: self.score(by_url[url]) for url in inserted}, nx=True)
+        return len(by_url) - len(inserted), len(inserted)
+
+    def claim(self, limit, owner=None, lease_seconds=None):
+        lease_seconds = lease_seconds or settings.CRAWL_LEASE_SECONDS
+        urls = self._script("claim", CLAIM_SCRIPT)(
+            keys=[self.queue_key, self.lease_key, self.score_key],
+            args=[limit, time.time() + lease_seconds],
+        )
+        urls = [url.decode() for url in urls]
+        url_objs = list(CrawlUrl.objects.filter(url__in=urls))
+        missing = set(urls) - {url_obj.url for url_obj in url_objs}
+        if missing:
+            self._release(missing)
+        url_objs.sort(key=lambda u: (-u.priority, u.id))
+        return url_objs
+
+    def resume(self, ids, owner=None):
+        url_objs = list(CrawlUrl.objects.filter(id__in=ids))
+        if not url_objs:
+            return []
+        pipe = self.client.pipeline()
+        for url_obj in url_objs:
+            pipe.zscore(self.lease_key, url_obj.url)
+        return [url_obj for url_obj, leased in zip(url_objs, pipe.execute()) if leased is not None]
+
+    def _release(self, urls):
+        pipe = self.client.pipeline()
+        pipe.zrem(self.lease_key, *urls)
+        pipe.hdel(self.score_key, *urls)
+        pipe.execute()
+
+    def complete(self, url_objs):
+        if not url_objs:
+            return
+        CrawlUrl.objects.bulk_update(url_objs, CRAWL_OUTCOME_FIELDS)
+        requeue = {url_obj.url: self.score(url_obj) for url_obj in url_objs if url_obj.status == "queued"}
+        pipe = self.client.pipeline()
+        if requeue:
+            pipe.zadd(self.queue_key, requeue)
+        pipe.zrem(self.lease_key, *[url_obj.url for url_obj in url_objs])
+        pipe.hdel(self.score_key, *[url_obj.url for url_obj in url_objs])
+        pipe.execute()
+
+    def reap(self):
+        return self._script("reap", REAP_SCRIPT)(
+            keys=[self.queue_key, self.lease_key, self.score_key],
+            args=[time.time()],
+        )
+
+    def sync(self, batch_size=5000):
+        """Push URLs queued in the database (recrawls, sitemaps, seeds) into Redis."""
+        added = 0
+        batch = []
+        rows = CrawlUrl.objects.filter(status="queued").values_list("url", "priority", "depth")
+        for url, priority, depth in rows.iterator(chunk_size=batch_size):
+            batch.extend([priority * 100 - min(depth, 99), url])
+            if len(batch) >= batch_size * 2:
+                added += self._sync_batch(batch)
+                batch = []
+        if batch:
+            added += self._sync_batch(batch)
+        return added
+
+    def _sync_batch(self, batch):
+        urls = batch[1::2]
+        pipe = self.client.pipeline()
+        for url in urls:
+            pipe.sadd(self.seen_key, self.digest(url))
+        pipe.execute()
+        return self._script("sync", SYNC_SCRIPT)(keys=[self.queue_key, self.lease_key], args=batch)
+
+    def has_work(self):
+        return self.client.zcard(self.queue_key) > 0
+
+    def stats(self):
+        pipe = self.client.pipeline()
+        pipe.zcard(self.queue_key)
+        pipe.zcard(self.lease_key)
+        pipe.zcount(self.lease_key, "-inf", time.time())
+        pipe.scard(self.seen_key)
+        queued, leased, expired, seen = pipe.execute()
+        return {"backend": self.name, "queued": queued, "leased": leased, "expired": expired, "seen": seen}
+
+
+_frontier = None
+
+
+def get_frontier():
+    """The frontier backend chosen by CRAWL_FRONTIER ("database" or "redis")."""
+    global _frontier
+    if _frontier is None:
+        _frontier = RedisFrontier() if settings.CRAWL_FRONTIER == "redis" else DatabaseFrontier()
+    return _frontier
+
+
+def status():
+    """Backend name and queue sizes for the dashboard."""
+    try:
+        return get_frontier().stats()
+    except redis.RedisError as exc:
+        logger.warning("Crawl frontier unavailable: %s", exc)
+        return None
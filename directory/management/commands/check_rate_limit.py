@@ -0,0 +1,122 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from directory.crawler import fetch_url, get_session
+from directory.ratelimit import HostTokenBucket
+
+
+FIXTURE = "andy_jones.html"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves the profile fixture for every path and records when each request arrived."""
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.arrivals.append(time.monotonic())
+        body = self.server.body
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def max_excess(arrivals, rate, burst, tolerance=0.05):
+    """Largest number of requests above what the bucket allows in any window of arrivals."""
+    arrivals = sorted(arrivals)
+    excess = 0
+    for i, start in enumerate(arrivals):
+        for j in range(i, len(arrivals)):
+            allowed = burst + (arrivals[j] - start + tolerance) * rate
+            excess = max(excess, (j - i + 1) - int(allowed))
+    return excess
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the rate-limited fetch path against a local HTTP stand-in server and "
+        "check that the host never sees more than CRAWL_RATE_LIMIT allows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=10, help="Total requests to send.")
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent workers sharing the bucket.")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.CRAWL_RATE_LIMIT,
+            help="Seconds between requests to one host.",
+        )
+        parser.add_argument("--burst", type=int, default=settings.CRAWL_RATE_BURST, help="Bucket capacity.")
+
+    def handle(self, *args, **options):
+        total = max(options["requests"], 1)
+        workers = max(options["workers"], 1)
+        interval = options["interval"]
+        burst = max(options["burst"], 1)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        server.lock = threading.Lock()
+        server.arrivals = []
+        server.body = (Path(settings.BASE_DIR) / FIXTURE).read_bytes()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host = f"127.0.0.1:{server.server_address[1]}"
+
+        # A fresh bucket key per run so earlier runs' debt does not leak in.
+        bucket = HostTokenBucket(interval, burst=burst)
+        bucket.prefix = f"{bucket.prefix}:check:{time.time_ns()}"
+        remaining = iter(range(total))
+        remaining_lock = threading.Lock()
+        errors = []
+
+        def worker():
+            session = get_session()
+            while True:
+                with remaining_lock:
+                    number = next(remaining, None)
+                if number is None:
+                    return
+                _, wait = bucket.reserve(host)
+                if wait:
+                    time.sleep(wait)
+                try:
+                    fetch_url(f"http://{host}/people/stand-in-{number}", session=session)
+                except Exception as exc:
+                    errors.append(exc)
+
+        started_at = time.monotonic()
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started_at
+        server.shutdown()
+        server.server_close()
+
+        arrivals = sorted(server.arrivals)
+        gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+        rate = 1.0 / interval if interval > 0 else float("inf")
+        excess = max_excess(arrivals, rate, burst) if interval > 0 else 0
+        self.stdout.write(
+            "Requests: {} | Errors: {} | Time: {:.1f}s | Limit: {:.2f}/s (burst {}) | Observed: {:.2f}/s | "
+            "Min gap: {:.3f}s | Within limit: {}".format(
+                len(arrivals),
+                len(errors),
+                elapsed,
+                rate,
+                burst,
+                (len(arrivals) - 1) / max(arrivals[-1] - arrivals[0], 0.001) if len(arrivals) > 1 else 0.0,
+                min(gaps) if gaps else 0.0,
+                "yes" if excess <= 0 else f"NO ({excess} over)",
+            )
+        )
@@ -0,0 +1,98 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from directory.models import PageBlob, StaffProfile
+from directory.pagestore import store_page, train_dictionary
+
+
+class Command(BaseCommand):
+    help = "Move inline StaffProfile.raw_html into the compressed page store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of profiles moved per transaction.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="Limit the number of profiles processed (0 = no limit).",
+        )
+        parser.add_argument(
+            "--train-dictionary",
+            action="store_true",
+            help="Train a new preset dictionary from sample pages before compressing.",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=200,
+            help="Number of pages sampled when training the dictionary.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        limit = options["limit"] or 0
+
+        if options["train_dictionary"]:
+            samples = list(
+                StaffProfile.objects.exclude(raw_html="").order_by("id").values_list("raw_html", flat=True)[: options["samples"]]
+            )
+            dictionary = train_dictionary(samples)
+            if dictionary is None:
+                self.stdout.write("No shared template found in sample pages; compressing without a dictionary.")
+            else:
+                self.stdout.write(
+                    "Trained dictionary {} from {} pages ({} bytes).".format(
+                        dictionary.id, dictionary.sample_count, len(dictionary.data)
+                    )
+                )
+
+        total = 0
+        raw_bytes = 0
+        stored_bytes = 0
+        last_id = 0
+        started_at = time.time()
+        while True:
+            size = min(batch_size, limit - total) if limit else batch_size
+            if size <= 0:
+                break
+            batch = list(
+                StaffProfile.objects.filter(id__gt=last_id)
+                .exclude(raw_html="")
+                .order_by("id")
+                .only("id", "raw_html")[:size]
+            )
+            if not batch:
+                break
+
+            for staff in batch:
+                raw_bytes += len(staff.raw_html.encode("utf-8"))
+                staff.raw_html_hash = store_page(staff.raw_html)
+                staff.raw_html = ""
+            StaffProfile.objects.bulk_update(batch, ["raw_html", "raw_html_hash"])
+            # Identical pages in a batch share one blob, so count each blob once.
+            stored_bytes += sum(
+                PageBlob.objects.filter(content_hash__in={staff.raw_html_hash for staff in batch}).values_list(
+                    "compressed_size", flat=True
+                )
+            )
+
+            total += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(
+                "Progress: {} | Raw: {} bytes | Stored: {} bytes".format(total, raw_bytes, stored_bytes)
+            )
+
+        elapsed = time.time() - started_at
+        saved = raw_bytes - stored_bytes
+        ratio = raw_bytes / stored_bytes if stored_bytes else 0.0
+        self.stdout.write(
+            "Moved: {} | Raw: {} bytes | Stored: {} bytes | Saved: {} bytes | Ratio: {:.1f}x | Time: {:.1f}s".format(
+                total, raw_bytes, stored_bytes, saved, ratio, elapsed
+            )
+        )
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from directory.crawler import parse_links, request_headers
+from directory.frontier import get_frontier, worker_id
+from directory.models import CrawlControl
+from directory.tasks import enqueue_links, host_bucket, record_response
+
+
+def _is_paused():
+    control = CrawlControl.objects.first()
+    return bool(control and control.is_paused)
+
+
+class Command(BaseCommand):
+    help = "Crawl the CrawlUrl frontier from a single asyncio process instead of Celery crawl_step chains."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.CRAWL_ASYNC_CONCURRENCY,
+            help="Maximum number of in-flight fetches.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.CRAWL_BATCH_SIZE,
+            help="Number of URLs claimed from the frontier per query.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.CRAWL_ASYNC_PARSE_PROCESSES,
+            help="Size of the process pool used for HTML parsing.",
+        )
+        parser.add_argument(
+            "--lease-seconds",
+            type=int,
+            default=settings.CRAWL_LEASE_SECONDS,
+            help="How long claimed URLs stay leased to this process before the reaper requeues them.",
+        )
+        parser.add_argument(
+            "--max-urls",
+            type=int,
+            default=0,
+            help="Stop after this many URLs have been claimed (0 = until the frontier is empty).",
+        )
+
+    def handle(self, *args, **options):
+        self.concurrency = max(options["concurrency"], 1)
+        self.batch_size = max(options["batch_size"], 1)
+        self.processes = max(options["processes"], 1)
+        self.max_urls = options["max_urls"] or 0
+        self.lease_seconds = max(options["lease_seconds"], 1)
+        # Book host slots no further ahead than half a lease, so nothing we hold can be reaped mid-wait.
+        self.horizon = min(settings.CRAWL_RESERVE_HORIZON, self.lease_seconds / 2)
+        self.claim_after = 0.0
+        self.owner = f"{worker_id()}:crawl"
+        self.counters = {"claimed": 0, "fetched": 0, "skipped": 0, "error": 0, "queued": 0, "inserted": 0}
+        self.outcomes = []
+        self.frontier = get_frontier()
+        self.frontier.sync()
+
+        started_at = time.time()
+        asyncio.run(self.crawl())
+        elapsed = time.time() - started_at
+        self.stdout.write(
+            "Claimed: {claimed} | Fetched: {fetched} | Skipped: {skipped} | Errors: {error} | "
+            "Handed back: {queued} | Links inserted: {inserted} | Time: {elapsed:.1f}s | Rate: {rate:.1f}/s".format(
+                elapsed=elapsed, rate=self.counters["claimed"] / max(elapsed, 0.001), **self.counters
+            )
+        )
+
+    async def crawl(self):
+        self.fetch_slots = asyncio.Semaphore(self.concurrency)
+        self.loop = asyncio.get_running_loop()
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        in_flight = set()
+        last_log = time.time()
+
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            async with httpx.AsyncClient(limits=limits, timeout=20, follow_redirects=True) as client:
+                while True:
+                    if await sync_to_async(_is_paused)():
+                        self.stdout.write("Crawl paused; waiting for in-flight fetches.")
+                        break
+
+                    # Keep up to twice the fetch concurrency queued locally so parsing
+                    # and bookkeeping overlap with network waits.
+                    room = self.concurrency * 2 - len(in_flight)
+                    if self.max_urls:
+                        room = min(room, self.max_urls - self.counters["claimed"])
+                    claimed = []
+                    if room > 0 and time.monotonic() >= self.claim_after:
+                        claimed = await sync_to_async(self.frontier.claim)(
+                            min(room, self.batch_size), owner=self.owner, lease_seconds=self.lease_seconds
+                        )
+                    self.counters["claimed"] += len(claimed)
+                    for url_obj in claimed:
+                        task = asyncio.create_task(self.crawl_one(client, pool, url_obj))
+                        in_flight.add(task)
+                        task.add_done_callback(in_flight.discard)
+
+                    if not claimed and not in_flight:
+                        # Handed-back URLs only become claimable again once flushed, and while every
+                        # host slot within the horizon is booked we wait for one to come into reach.
+                        backoff = self.claim_after - time.monotonic()
+                        if backoff > 0 or self.outcomes:
+                            await self.flush()
+                            await asyncio.sleep(max(backoff, 0))
+                            continue
+                        break
+                    if not claimed or len(in_flight) >= self.concurrency * 2:
+                        await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+                    if len(self.outcomes) >= self.batch_size:
+                        await self.flush()
+                    if time.time() - last_log >= 5:
+                        self.stdout.write(
+                            "Progress: claimed {claimed} | fetched {fetched} | skipped {skipped} | errors {error} | "
+                            "in flight {in_flight}".format(in_flight=len(in_flight), **self.counters)
+                        )
+                        last_log = time.time()
+
+                if in_flight:
+                    await asyncio.wait(in_flight)
+                await self.flush()
+
+    async def crawl_one(self, client, pool, url_obj):
+        try:
+            host = urlparse(url_obj.url).netloc
+            # Book the host's next slot once and sleep until it, instead of polling for a token.
+            booked, wait = await sync_to_async(host_bucket.reserve, thread_sensitive=False)(host, self.horizon)
+            if not booked:
+                # Hand the URL back and stop claiming until the host's slots are within reach.
+                url_obj.status = "queued"
+                self.claim_after = max(self.claim_after, time.monotonic() + wait - self.horizon)
+                self.counters["queued"] += 1
+                self.outcomes.append(url_obj)
+                return
+            if wait:
+                await asyncio.sleep(wait)
+
+            async with self.fetch_slots:
+                response = await client.get(
+                    url_obj.url,
+                    headers=request_headers(url_obj.etag, url_obj.last_modified),
+                )
+            html = response.text if response.status_code == 200 else ""
+            follow = await sync_to_async(record_response)(url_obj, response.status_code, response.headers, html)
+            if follow:
+                links = await self.loop.run_in_executor(pool, parse_links, html, url_obj.url)
+                link_counters = await sync_to_async(enqueue_links)(links, url_obj.depth + 1, priority=url_obj.priority)
+                self.counters["inserted"] += link_counters["inserted"]
+        except Exception as exc:
+            url_obj.status = "error"
+            url_obj.error = str(exc)
+        self.counters[url_obj.status] = self.counters.get(url_obj.status, 0) + 1
+        self.outcomes.append(url_obj)
+
+    async def flush(self):
+        outcomes, self.outcomes = self.outcomes, []
+        if outcomes:
+            await sync_to_async(self.frontier.complete)(outcomes)
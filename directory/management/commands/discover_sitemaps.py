@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from directory.frontier import get_frontier
+from directory.sitemaps import discover_profiles, new_discovery, sitemap_roots
+
+
+class Command(BaseCommand):
+    help = "Queue staff profile URLs found in robots.txt sitemaps and sitemap indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sitemaps",
+            nargs="*",
+            help="Sitemap URLs to read instead of those advertised in robots.txt.",
+        )
+
+    def handle(self, *args, **options):
+        roots = options["sitemaps"] or sitemap_roots()
+        self.stdout.write("Sitemaps: {}".format(", ".join(roots)))
+        started_at = time.time()
+        state = new_discovery(roots)
+        discover_profiles(state)
+        # Make the new rows visible to a Redis frontier straight away.
+        synced = get_frontier().sync()
+        elapsed = time.time() - started_at
+        self.stdout.write(
+            "Sitemaps read: {sitemaps} | Errors: {errors} | URLs: {urls} | Profiles: {matched} | "
+            "Inserted: {inserted} | Requeued: {requeued} | Unchanged: {unchanged} | Already queued: {known} | "
+            "Pushed to frontier: {synced} | Time: {elapsed:.1f}s".format(elapsed=elapsed, synced=synced, **state["counters"])
+        )
@@ -2,13 +2,15 @@ import time
 
 from django.core.management.base import BaseCommand
 
-from directory.crawler import extract_staff_fields, extract_text_content
-from directory.models import Department, Faculty, Institute, StaffProfile
+from directory.crawler import ParsedPage
+from directory.models import StaffProfile
+from directory.pagestore import load_profile_html
+from directory.taxonomy import get_or_create_units
 from directory.utils import hash_text
 
 
 class Command(BaseCommand):
-    help = "Reprocess staff profiles from stored raw_html to update extracted fields."
+    help = "Reprocess staff profiles from their stored HTML to update extracted fields."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -33,7 +35,7 @@ class Command(BaseCommand):
         dry_run = options["dry_run"]
         reembed = options["reembed"]
 
-        qs = StaffProfile.objects.order_by("id")
+        qs = StaffProfile.objects.defer("raw_html").order_by("id")
         if limit:
             qs = qs[:limit]
 
@@ -47,40 +49,21 @@ class Command(BaseCommand):
 
         for staff in qs.iterator(chunk_size=200):
             total += 1
-            if not staff.raw_html:
+            html = load_profile_html(staff)
+            if not html:
                 skipped += 1
                 continue
 
-            fields = extract_staff_fields(staff.raw_html, base_url=staff.profile_url)
-            new_text_content = extract_text_content(staff.raw_html)
+            page = ParsedPage(html, staff.profile_url)
+            fields = page.staff_fields
+            new_text_content = page.text_content
             new_content_hash = hash_text(new_text_content)
 
             faculty_name = (fields.get("faculty", "") or "").strip()
             institute_name = (fields.get("institute", "") or "").strip()
             department_name = (fields.get("department", "") or "").strip()
 
-            faculty = None
-            institute = None
-            department = None
-
-            if faculty_name:
-                faculty, _ = Faculty.objects.get_or_create(name=faculty_name)
-            if institute_name:
-                institute, _ = Institute.objects.get_or_create(
-                    name=institute_name,
-                    defaults={"faculty": faculty},
-                )
-                if faculty and institute.faculty_id != faculty.id:
-                    institute.faculty = faculty
-                    institute.save(update_fields=["faculty"])
-            if department_name:
-                department, _ = Department.objects.get_or_create(
-                    name=department_name,
-                    defaults={"institute": institute},
-                )
-                if institute and department.institute_id != institute.id:
-                    department.institute = institute
-                    department.save(update_fields=["institute"])
+            faculty, institute, department = get_or_create_units(faculty_name, institute_name, department_name)
 
             update_fields = []
 
@@ -128,6 +111,8 @@ class Command(BaseCommand):
 
                 if not dry_run:
                     staff.save(update_fields=update_fields)
+                    if {"faculty", "institute", "department"} & set(update_fields):
+                        staff.sync_chunk_units()
                     if reembed:
                         from directory.tasks import embed_staff_profile
 
@@ -149,7 +134,7 @@ class Command(BaseCommand):
         elapsed = time.time() - started_at
         rate = total / max(elapsed, 0.001)
         self.stdout.write(
-            "Processed: {} | Updated: {} | Skipped (no raw_html): {} | Embeds queued: {} | Time: {:.1f}s | Rate: {:.1f}/s".format(
+            "Processed: {} | Updated: {} | Skipped (no stored HTML): {} | Embeds queued: {} | Time: {:.1f}s | Rate: {:.1f}/s".format(
                 total, updated, skipped, embeds, elapsed, rate
             )
         )
@@ -0,0 +1,56 @@
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+import pgvector.django
+
+
+def forwards(apps, schema_editor):
+    Chunk = apps.get_model("directory", "Chunk")
+    EmbeddingCache = apps.get_model("directory", "EmbeddingCache")
+    model = settings.OPENAI_EMBED_MODEL
+
+    batch = []
+    cache_rows = []
+    for chunk in Chunk.objects.order_by("id").iterator(chunk_size=500):
+        chunk.content_hash = hashlib.sha256((chunk.chunk_text or "").encode("utf-8")).hexdigest()
+        batch.append(chunk)
+        cache_rows.append(EmbeddingCache(content_hash=chunk.content_hash, model=model, embedding=chunk.embedding))
+        if len(batch) >= 500:
+            Chunk.objects.bulk_update(batch, ["content_hash"])
+            EmbeddingCache.objects.bulk_create(cache_rows, ignore_conflicts=True)
+            batch = []
+            cache_rows = []
+    if batch:
+        Chunk.objects.bulk_update(batch, ["content_hash"])
+        EmbeddingCache.objects.bulk_create(cache_rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("directory", "0007_pageblob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chunk",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.CreateModel(
+            name="EmbeddingCache",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("content_hash", models.CharField(max_length=64)),
+                ("model", models.CharField(max_length=128)),
+                ("embedding", pgvector.django.VectorField(dimensions=1536)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("content_hash", "model"), name="embedding_cache_hash_model"),
+                ],
+            },
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations
+import pgvector.django
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("directory", "0008_chunk_content_hash_embeddingcache"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="chunk",
+            name="embedding",
+            field=pgvector.django.VectorField(blank=True, dimensions=1536, null=True),
+        ),
+    ]
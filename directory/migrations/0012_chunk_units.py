@@ -0,0 +1,55 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("directory", "0011_log_created_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chunk",
+            name="faculty",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="directory.faculty",
+            ),
+        ),
+        migrations.AddField(
+            model_name="chunk",
+            name="institute",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="directory.institute",
+            ),
+        ),
+        migrations.AddField(
+            model_name="chunk",
+            name="department",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="directory.department",
+            ),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE directory_chunk AS c
+                SET faculty_id = s.faculty_id,
+                    institute_id = s.institute_id,
+                    department_id = s.department_id
+                FROM directory_staffprofile AS s
+                WHERE c.staff_id = s.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,14 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("directory", "0012_chunk_units"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="staffprofile",
+            index=models.Index(fields=["department", "name", "profile_url"], name="staff_department_name_url"),
+        ),
+    ]
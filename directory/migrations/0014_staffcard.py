@@ -0,0 +1,62 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_cards(apps, schema_editor):
+    StaffProfile = apps.get_model("directory", "StaffProfile")
+    StaffCard = apps.get_model("directory", "StaffCard")
+    staff_qs = StaffProfile.objects.order_by("id").values(
+        "id", "name", "title", "suffix", "profile_url", "faculty__name", "institute__name", "department__name"
+    )
+    batch = []
+    for row in staff_qs.iterator(chunk_size=1000):
+        batch.append(
+            StaffCard(
+                staff_id=row["id"],
+                name=row["name"],
+                title=row["title"],
+                suffix=row["suffix"],
+                faculty_name=row["faculty__name"] or "",
+                institute_name=row["institute__name"] or "",
+                department_name=row["department__name"] or "",
+                profile_url=row["profile_url"],
+            )
+        )
+        if len(batch) >= 1000:
+            StaffCard.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        StaffCard.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("directory", "0013_staff_department_name_url"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StaffCard",
+            fields=[
+                (
+                    "staff",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="card",
+                        serialize=False,
+                        to="directory.staffprofile",
+                    ),
+                ),
+                ("name", models.CharField(blank=True, max_length=255)),
+                ("title", models.CharField(blank=True, max_length=64)),
+                ("suffix", models.CharField(blank=True, max_length=128)),
+                ("faculty_name", models.CharField(blank=True, max_length=255)),
+                ("institute_name", models.CharField(blank=True, max_length=255)),
+                ("department_name", models.CharField(blank=True, max_length=255)),
+                ("profile_url", models.URLField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("directory", "0014_staffcard"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PageDictionary",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("data", models.BinaryField()),
+                ("sample_count", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="pageblob",
+            name="dictionary",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="directory.pagedictionary",
+            ),
+        ),
+        migrations.AddField(
+            model_name="staffprofile",
+            name="raw_html_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,53 @@
+import re
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_schedule(apps, schema_editor):
+    CrawlUrl = apps.get_model("directory", "CrawlUrl")
+    keep = re.compile(settings.CRAWL_KEEP_PATH_REGEX)
+    profile_ids = []
+    for pk, url in CrawlUrl.objects.values_list("id", "url").iterator(chunk_size=5000):
+        if keep.match(urlparse(url).path or ""):
+            profile_ids.append(pk)
+        if len(profile_ids) >= 5000:
+            CrawlUrl.objects.filter(id__in=profile_ids).update(is_profile=True)
+            profile_ids = []
+    if profile_ids:
+        CrawlUrl.objects.filter(id__in=profile_ids).update(is_profile=True)
+
+    # Spread existing URLs over one default interval from their last fetch.
+    interval = settings.CRAWL_RECRAWL_DEFAULT_INTERVAL
+    schema_editor.execute(
+        "UPDATE directory_crawlurl SET change_interval = %s, "
+        "next_fetch_at = last_fetched_at + make_interval(secs => %s) "
+        "WHERE last_fetched_at IS NOT NULL",
+        [interval, interval],
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("directory", "0015_page_dictionary_raw_html_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="crawlurl",
+            name="next_fetch_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="crawlurl",
+            name="change_interval",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="crawlurl",
+            name="is_profile",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_schedule, migrations.RunPython.noop),
+    ]
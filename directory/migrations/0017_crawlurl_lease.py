@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("directory", "0016_crawlurl_recrawl_schedule"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="crawlurl",
+            name="lease_owner",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="crawlurl",
+            name="lease_expires_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="crawlurl",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("queued", "Queued"),
+                    ("leased", "Leased"),
+                    ("fetched", "Fetched"),
+                    ("skipped", "Skipped"),
+                    ("error", "Error"),
+                ],
+                default="queued",
+                max_length=16,
+            ),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("directory", "0017_crawlurl_lease"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chunk",
+            name="embed_claimed_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
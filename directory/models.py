@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.postgres.indexes import GinIndex
 from django.contrib.postgres.search import SearchVectorField
 from pgvector.django import VectorField, HnswIndex
@@ -17,7 +18,9 @@ class StaffProfile(models.Model):
     department_text = models.CharField(max_length=255, blank=True)
 
     text_content = models.TextField(blank=True)
+    # Legacy inline copy; pages now live in PageBlob under raw_html_hash (see compress_raw_html).
     raw_html = models.TextField(blank=True)
+    raw_html_hash = models.CharField(max_length=64, blank=True, db_index=True)
 
     etag = models.CharField(max_length=255, blank=True)
     last_modified = models.CharField(max_length=255, blank=True)
@@ -25,6 +28,61 @@ class StaffProfile(models.Model):
     last_fetched_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of department listings.
+            models.Index(fields=["department", "name", "profile_url"], name="staff_department_name_url"),
+        ]
+
+    # Fields copied onto StaffCard; saving any of them rewrites the card.
+    CARD_FIELDS = {"name", "title", "suffix", "faculty", "institute", "department", "profile_url"}
+
+    def __str__(self):
+        return self.name or self.profile_url
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or self.CARD_FIELDS & set(update_fields):
+            self.sync_card()
+
+    def sync_card(self):
+        """Write the denormalised StaffCard used to render search and chat results."""
+        return StaffCard.objects.update_or_create(
+            staff=self,
+            defaults={
+                "name": self.name,
+                "title": self.title,
+                "suffix": self.suffix,
+                "faculty_name": self.faculty.name if self.faculty else "",
+                "institute_name": self.institute.name if self.institute else "",
+                "department_name": self.department.name if self.department else "",
+                "profile_url": self.profile_url,
+            },
+        )[0]
+
+    def sync_chunk_units(self):
+        """Copy this profile's faculty, institute and department onto its chunks."""
+        return self.chunks.update(
+            faculty_id=self.faculty_id,
+            institute_id=self.institute_id,
+            department_id=self.department_id,
+        )
+
+
+class StaffCard(models.Model):
+    """Just the fields needed to render a result card, without StaffProfile's page text."""
+
+    staff = models.OneToOneField(StaffProfile, on_delete=models.CASCADE, primary_key=True, related_name="card")
+    name = models.CharField(max_length=255, blank=True)
+    title = models.CharField(max_length=64, blank=True)
+    suffix = models.CharField(max_length=128, blank=True)
+    faculty_name = models.CharField(max_length=255, blank=True)
+    institute_name = models.CharField(max_length=255, blank=True)
+    department_name = models.CharField(max_length=255, blank=True)
+    profile_url = models.URLField()
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return self.name or self.profile_url
 
@@ -32,6 +90,14 @@ class StaffProfile(models.Model):
 class Faculty(models.Model):
     name = models.CharField(max_length=255, unique=True)
 
+    def save(self, *args, **kwargs):
+        renamed = not self._state.adding and "name" in (kwargs.get("update_fields") or {"name"})
+        super().save(*args, **kwargs)
+        # Cards copy the unit's name; a rename in the admin must reach them.
+        if renamed:
+            cards = StaffCard.objects.filter(staff__faculty=self)
+            cards.exclude(faculty_name=self.name).update(faculty_name=self.name)
+
     def __str__(self):
         return self.name
 
@@ -40,6 +106,14 @@ class Institute(models.Model):
     name = models.CharField(max_length=255, unique=True)
     faculty = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True, blank=True, related_name="institutes")
 
+    def save(self, *args, **kwargs):
+        renamed = not self._state.adding and "name" in (kwargs.get("update_fields") or {"name"})
+        super().save(*args, **kwargs)
+        # Cards copy the unit's name; a rename in the admin must reach them.
+        if renamed:
+            cards = StaffCard.objects.filter(staff__institute=self)
+            cards.exclude(institute_name=self.name).update(institute_name=self.name)
+
     def __str__(self):
         return self.name
 
@@ -48,15 +122,30 @@ class Department(models.Model):
     name = models.CharField(max_length=255, unique=True)
     institute = models.ForeignKey(Institute, on_delete=models.SET_NULL, null=True, blank=True, related_name="departments")
 
+    def save(self, *args, **kwargs):
+        renamed = not self._state.adding and "name" in (kwargs.get("update_fields") or {"name"})
+        super().save(*args, **kwargs)
+        # Cards copy the unit's name; a rename in the admin must reach them.
+        if renamed:
+            cards = StaffCard.objects.filter(staff__department=self)
+            cards.exclude(department_name=self.name).update(department_name=self.name)
+
     def __str__(self):
         return self.name
 
 
 class Chunk(models.Model):
     staff = models.ForeignKey(StaffProfile, on_delete=models.CASCADE, related_name="chunks")
+    # Copies of the staff member's units so filtered searches avoid joining through StaffProfile.
+    faculty = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    institute = models.ForeignKey(Institute, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
     chunk_index = models.IntegerField()
     chunk_text = models.TextField()
-    embedding = VectorField(dimensions=1536)
+    content_hash = models.CharField(max_length=64, blank=True)
+    embedding = VectorField(dimensions=1536, null=True, blank=True)
+    # Set while embed_pending_chunks has the chunk out at the embeddings API.
+    embed_claimed_until = models.DateTimeField(null=True, blank=True)
     tsv = SearchVectorField(null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -70,9 +159,25 @@ class Chunk(models.Model):
         return f"{self.staff_id}:{self.chunk_index}"
 
 
+class EmbeddingCache(models.Model):
+    content_hash = models.CharField(max_length=64)
+    model = models.CharField(max_length=128)
+    embedding = VectorField(dimensions=1536)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["content_hash", "model"], name="embedding_cache_hash_model"),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.content_hash}"
+
+
 class CrawlUrl(models.Model):
     STATUS_CHOICES = [
         ("queued", "Queued"),
+        ("leased", "Leased"),
         ("fetched", "Fetched"),
         ("skipped", "Skipped"),
         ("error", "Error"),
@@ -87,12 +192,41 @@ class CrawlUrl(models.Model):
     last_modified = models.CharField(max_length=255, blank=True)
     content_hash = models.CharField(max_length=64, blank=True)
     last_fetched_at = models.DateTimeField(null=True, blank=True)
+    next_fetch_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    change_interval = models.IntegerField(null=True, blank=True)
+    is_profile = models.BooleanField(default=False)
+    # Set while a worker holds the URL; expired leases are returned to the queue.
+    lease_owner = models.CharField(max_length=255, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
     error = models.TextField(blank=True)
 
     def __str__(self):
         return self.url
 
 
+class PageDictionary(models.Model):
+    """Preset zlib dictionary trained on the shared page template."""
+
+    data = models.BinaryField()
+    sample_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"dictionary {self.id} ({len(self.data)} bytes)"
+
+
+class PageBlob(models.Model):
+    content_hash = models.CharField(max_length=64, unique=True)
+    data = models.BinaryField()
+    dictionary = models.ForeignKey(PageDictionary, on_delete=models.PROTECT, null=True, blank=True)
+    size = models.IntegerField(default=0)
+    compressed_size = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.content_hash
+
+
 class SeedUrl(models.Model):
     url = models.URLField(unique=True)
     priority = models.IntegerField(default=10)
@@ -121,7 +255,7 @@ class SearchLog(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     request_meta = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
         return f"{self.created_at:%Y-%m-%d %H:%M:%S} search"
@@ -136,7 +270,7 @@ class ChatLog(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     request_meta = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
         return f"{self.created_at:%Y-%m-%d %H:%M:%S} chat"
@@ -1,19 +1,204 @@
 import os
 import json
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import openai
 from openai import OpenAI
 
 
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class OpenAIUnavailable(RuntimeError):
+    """Raised without calling the API while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return "closed"
+        if now - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        # Once the cooldown has passed, one caller goes through as the trial;
+        # everyone else is still rejected until it succeeds (closing the
+        # circuit) or fails (re-opening it). A trial that never reports back
+        # is replaced after another cooldown.
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == "closed":
+                return
+            if state == "half-open" and (
+                self.probe_started_at is None or now - self.probe_started_at >= self.cooldown
+            ):
+                self.probe_started_at = now
+                return
+        raise OpenAIUnavailable("OpenAI API unavailable; circuit breaker is open")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold or self.probe_started_at is not None:
+                self.opened_at = time.monotonic()
+                self.probe_started_at = None
+
+
+def _retry_after(exc):
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
 class OpenAIClient:
+    """OpenAI wrapper with per-kind concurrency limits, retries and a circuit breaker.
+
+    Use get_openai_client() to share one instance (and its connection pool)
+    per process.
+    """
+
     def __init__(self):
         api_key = os.getenv("OPENAI_API_KEY", "")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY is not set")
-        self.client = OpenAI(api_key=api_key)
+        # Retries are handled here so they respect the breaker and semaphores.
+        self.client = OpenAI(api_key=api_key, max_retries=0, timeout=float(os.getenv("OPENAI_TIMEOUT", "60")))
         self.embed_model = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
         self.chat_model = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
+        self.pid = os.getpid()
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+        self.backoff_base = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+        self.backoff_max = float(os.getenv("OPENAI_BACKOFF_MAX", "30"))
+        # Total time one call may spend waiting between retries, Retry-After included.
+        self.retry_budget = float(os.getenv("OPENAI_RETRY_BUDGET", "60"))
+        self.limits = {
+            "embed": threading.BoundedSemaphore(int(os.getenv("OPENAI_EMBED_CONCURRENCY", "4"))),
+            "chat": threading.BoundedSemaphore(int(os.getenv("OPENAI_CHAT_CONCURRENCY", "8"))),
+        }
+        self.breaker = CircuitBreaker(
+            threshold=int(os.getenv("OPENAI_BREAKER_THRESHOLD", "5")),
+            cooldown=float(os.getenv("OPENAI_BREAKER_COOLDOWN", "30")),
+        )
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            kind: {"in_flight": 0, "calls": 0, "retries": 0, "failures": 0, "latency_total": 0.0, "latency_max": 0.0}
+            for kind in self.limits
+        }
+
+    def _record(self, kind, **deltas):
+        with self._metrics_lock:
+            metrics = self._metrics[kind]
+            for name, delta in deltas.items():
+                metrics[name] += delta
+
+    def _observe_latency(self, kind, elapsed):
+        with self._metrics_lock:
+            metrics = self._metrics[kind]
+            metrics["calls"] += 1
+            metrics["latency_total"] += elapsed
+            metrics["latency_max"] = max(metrics["latency_max"], elapsed)
+
+    def metrics(self):
+        with self._metrics_lock:
+            snapshot = {}
+            for kind, metrics in self._metrics.items():
+                snapshot[kind] = {
+                    **metrics,
+                    "latency_avg": round(metrics["latency_total"] / metrics["calls"], 3) if metrics["calls"] else 0.0,
+                }
+        snapshot["circuit"] = self.breaker.state
+        return snapshot
+
+    def _backoff(self, attempt, exc):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            # The server's requested wait is honoured even above backoff_max.
+            delay = max(delay, retry_after)
+        return delay
+
+    def _call(self, kind, func, **kwargs):
+        self.breaker.before_call()
+        with self.limits[kind]:
+            self._record(kind, in_flight=1)
+            try:
+                return self._with_retries(kind, func, **kwargs)
+            finally:
+                self._record(kind, in_flight=-1)
+
+    def _with_retries(self, kind, func, **kwargs):
+        attempt = 0
+        deadline = time.monotonic() + self.retry_budget
+        while True:
+            started_at = time.monotonic()
+            try:
+                result = func(**kwargs)
+            except RETRYABLE_ERRORS as exc:
+                self.breaker.record_failure()
+                self._record(kind, failures=1)
+                if attempt >= self.max_retries or self.breaker.state == "open":
+                    raise
+                delay = self._backoff(attempt, exc)
+                # Fail fast rather than retry early when the wait would overrun the budget.
+                if time.monotonic() + delay > deadline:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                self._record(kind, retries=1)
+                continue
+            self._observe_latency(kind, time.monotonic() - started_at)
+            self.breaker.record_success()
+            return result
 
     def embed_texts(self, texts):
-        response = self.client.embeddings.create(
+        response = self._call(
+            "embed",
+            self.client.embeddings.create,
             model=self.embed_model,
             input=texts,
         )
@@ -30,10 +215,11 @@ class OpenAIClient:
             "\"I cannot find that in the staff profiles.\" and people to an empty array. "
             "Output JSON only."
         )
-        context_text = "\n\n".join(context_blocks)
-        user = f"Question: {question}\n\nContext:\n{context_text}"
+        user = self._chat_user_message(question, context_blocks)
 
-        response = self.client.chat.completions.create(
+        response = self._call(
+            "chat",
+            self.client.chat.completions.create,
             model=self.chat_model,
             messages=[
                 {"role": "system", "content": system},
@@ -50,3 +236,54 @@ class OpenAIClient:
                 "summary": content or "I cannot find that in the staff profiles.",
                 "people": [],
             }
+
+    def stream_chat_with_context(self, question, context_blocks):
+        """Yield the summary text in pieces as the completion streams in."""
+        system = (
+            "You are a staff directory assistant. Answer only using the provided context. "
+            "Reply with a short plain text summary in one brief paragraph. "
+            "Do not use markdown, headings, bullets, numbering, or labels. "
+            "If the answer is not in the context, reply exactly "
+            "\"I cannot find that in the staff profiles.\""
+        )
+        # Only opening the stream is retried; the chat slot is held until it is consumed.
+        self.breaker.before_call()
+        with self.limits["chat"]:
+            self._record("chat", in_flight=1)
+            try:
+                stream = self._with_retries(
+                    "chat",
+                    self.client.chat.completions.create,
+                    model=self.chat_model,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": self._chat_user_message(question, context_blocks)},
+                    ],
+                    temperature=0.2,
+                    stream=True,
+                )
+                for event in stream:
+                    if not event.choices:
+                        continue
+                    delta = event.choices[0].delta.content
+                    if delta:
+                        yield delta
+            finally:
+                self._record("chat", in_flight=-1)
+
+    def _chat_user_message(self, question, context_blocks):
+        context_text = "\n\n".join(context_blocks)
+        return f"Question: {question}\n\nContext:\n{context_text}"
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_openai_client():
+    """Return the process-wide OpenAIClient, rebuilding it after a fork."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None or _shared_client.pid != os.getpid():
+            _shared_client = OpenAIClient()
+        return _shared_client
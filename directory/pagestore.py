@@ -0,0 +1,129 @@
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Exists, OuterRef
+
+from .models import CrawlUrl, PageBlob, PageDictionary, StaffProfile
+from .utils import hash_text
+
+
+# zlib only looks back 32 KiB, so a longer preset dictionary is wasted.
+DICTIONARY_SIZE = 32 * 1024
+DICTIONARY_REFRESH_SECONDS = 300
+
+# Dictionaries never change once written, so they are kept for the process lifetime.
+_dictionaries = {}
+_current_dictionary = {"id": None, "checked_at": 0.0}
+
+
+def _dictionary_data(dictionary_id):
+    if dictionary_id not in _dictionaries:
+        _dictionaries[dictionary_id] = bytes(PageDictionary.objects.values_list("data", flat=True).get(id=dictionary_id))
+    return _dictionaries[dictionary_id]
+
+
+def current_dictionary_id():
+    """Id of the newest dictionary, re-read at most every DICTIONARY_REFRESH_SECONDS."""
+    now = time.monotonic()
+    if now - _current_dictionary["checked_at"] >= DICTIONARY_REFRESH_SECONDS:
+        _current_dictionary["id"] = PageDictionary.objects.order_by("-id").values_list("id", flat=True).first()
+        _current_dictionary["checked_at"] = now
+    return _current_dictionary["id"]
+
+
+def compress(raw, dictionary_id=None):
+    if dictionary_id is None:
+        return zlib.compress(raw, 6)
+    compressor = zlib.compressobj(6, zdict=_dictionary_data(dictionary_id))
+    return compressor.compress(raw) + compressor.flush()
+
+
+def decompress(data, dictionary_id=None):
+    if dictionary_id is None:
+        return zlib.decompress(data)
+    decompressor = zlib.decompressobj(zdict=_dictionary_data(dictionary_id))
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def store_page(html):
+    """Store a page body compressed and return its content hash as the reference."""
+    content_hash = hash_text(html)
+    raw = (html or "").encode("utf-8")
+    dictionary_id = current_dictionary_id()
+    data = compress(raw, dictionary_id)
+    PageBlob.objects.bulk_create(
+        [
+            PageBlob(
+                content_hash=content_hash,
+                data=data,
+                dictionary_id=dictionary_id,
+                size=len(raw),
+                compressed_size=len(data),
+            )
+        ],
+        ignore_conflicts=True,
+    )
+    return content_hash
+
+
+def load_page(content_hash):
+    blob = PageBlob.objects.only("data", "dictionary_id").get(content_hash=content_hash)
+    return decompress(bytes(blob.data), blob.dictionary_id).decode("utf-8")
+
+
+def load_profile_html(staff):
+    """Return a profile's stored HTML, decompressing it only now that it is needed."""
+    if staff.raw_html_hash:
+        return load_page(staff.raw_html_hash)
+    return staff.raw_html
+
+
+def train_dictionary(pages, size=DICTIONARY_SIZE):
+    """Build and save a preset dictionary from lines shared by the sample pages.
+
+    Lines that appear in at least half the samples are the shared template
+    (navigation, footer, scripts). zlib favours matches near the end of the
+    dictionary, so the most common lines go last.
+    """
+    pages = [page for page in pages if page]
+    if not pages:
+        return None
+    counts = Counter()
+    for page in pages:
+        counts.update({line.strip() for line in page.splitlines() if len(line.strip()) >= 8})
+    threshold = max(len(pages) // 2, 1)
+    common = sorted((line for line, count in counts.items() if count >= threshold), key=lambda line: (counts[line], len(line)))
+
+    selected = []
+    used = 0
+    for line in reversed(common):
+        encoded = line.encode("utf-8") + b"\n"
+        if used + len(encoded) > size:
+            continue
+        selected.append(encoded)
+        used += len(encoded)
+    if not selected:
+        return None
+    dictionary = PageDictionary.objects.create(data=b"".join(reversed(selected)), sample_count=len(pages))
+    _current_dictionary["checked_at"] = 0.0
+    return dictionary
+
+
+def collect_garbage(grace_seconds=60 * 60 * 24):
+    """Delete blobs no longer referenced by any CrawlUrl or StaffProfile.
+
+    Blobs younger than the grace period are kept so pages still waiting in a
+    task queue are not removed from under their consumer.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    crawled = CrawlUrl.objects.filter(content_hash=OuterRef("content_hash"))
+    profiles = StaffProfile.objects.filter(raw_html_hash=OuterRef("content_hash"))
+    deleted, _ = (
+        PageBlob.objects.filter(created_at__lt=cutoff)
+        .exclude(Exists(crawled))
+        .exclude(Exists(profiles))
+        .delete()
+    )
+    return deleted
@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+
+import redis
+
+from .cache import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+# Refill the bucket from the elapsed time, then book the next request slot.
+# A slot up to ``horizon`` seconds ahead may be booked (a negative horizon has
+# no limit), leaving the bucket in debt until it refills. Returns {booked,
+# seconds until the slot}; nothing is taken when the slot is too far ahead.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local horizon = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = math.max(0, (1 - tokens) / rate)
+local booked = 0
+if horizon < 0 or wait <= horizon then
+    tokens = tokens - 1
+    booked = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - math.min(tokens, 0)) / rate) + 60)
+return {booked, tostring(wait)}
+"""
+
+
+class HostTokenBucket:
+    """Per-host token bucket shared by all workers through Redis.
+
+    ``interval`` is the number of seconds between requests to one host (the
+    CRAWL_RATE_LIMIT setting) and ``burst`` is the bucket capacity. Nothing
+    here sleeps: acquire() takes a token only if one is free now, while
+    reserve() books the host's next free slot and says how long until it
+    comes round, so callers can schedule the request instead of polling.
+    If Redis is unreachable the bucket falls back to per-process state.
+    """
+
+    prefix = "staffsearch:bucket"
+
+    def __init__(self, interval, burst=1, client=None):
+        self.interval = interval
+        self.burst = max(burst, 1)
+        self._client = client
+        self._script = None
+        self._local = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_redis()
+        return self._client
+
+    def acquire(self, host):
+        """Take a token if one is free: 0 when taken, otherwise seconds until one will be."""
+        booked, wait = self.reserve(host, horizon=0)
+        return 0.0 if booked else wait
+
+    def reserve(self, host, horizon=None):
+        """Book the host's next request slot if it is at most ``horizon`` seconds away.
+
+        Returns (booked, wait): the caller that booked a slot owns it and
+        should make its request ``wait`` seconds from now. ``horizon=None``
+        books however far ahead the slot is.
+        """
+        if self.interval <= 0:
+            return True, 0.0
+        rate = 1.0 / self.interval
+        horizon = -1 if horizon is None else horizon
+        try:
+            if self._script is None:
+                self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+            booked, wait = self._script(keys=[f"{self.prefix}:{host}"], args=[rate, self.burst, horizon])
+            return bool(booked), float(wait)
+        except redis.RedisError as exc:
+            logger.warning("Shared rate limiter unavailable, using local bucket: %s", exc)
+            return self._reserve_local(host, rate, horizon)
+
+    def _reserve_local(self, host, rate, horizon):
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._local.get(host, (float(self.burst), now))
+            tokens = min(self.burst, tokens + max(0.0, now - ts) * rate)
+            wait = max(0.0, (1 - tokens) / rate)
+            booked = horizon < 0 or wait <= horizon
+            if booked:
+                tokens -= 1
+            self._local[host] = (tokens, now)
+        return booked, wait
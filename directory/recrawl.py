@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db.models import Case, F, Q, Value, When
+
+from .models import CrawlUrl
+
+
+# Waiting for a worker or held by one; never requeued from under it.
+PENDING_STATUSES = ("queued", "leased")
+
+
+def adjust_interval(interval, changed):
+    """Estimate a URL's change interval from the latest fetch outcome.
+
+    A changed page halves the interval and an unchanged one (304 or same
+    content hash) grows it by half, within the configured bounds. ``None``
+    (first fetch or an error) leaves it as it is.
+    """
+    interval = interval or settings.CRAWL_RECRAWL_DEFAULT_INTERVAL
+    if changed is True:
+        interval = interval // 2
+    elif changed is False:
+        interval = int(interval * 1.5)
+    return min(max(interval, settings.CRAWL_RECRAWL_MIN_INTERVAL), settings.CRAWL_RECRAWL_MAX_INTERVAL)
+
+
+def schedule_next_fetch(url_obj, changed, now=None):
+    now = now or datetime.now(timezone.utc)
+    url_obj.change_interval = adjust_interval(url_obj.change_interval, changed)
+    url_obj.next_fetch_at = now + timedelta(seconds=url_obj.change_interval)
+
+
+def requeue_due_urls(now=None):
+    """Queue every URL whose next fetch is due, raising staff profiles to CRAWL_PROFILE_PRIORITY.
+
+    Other URLs keep their priority, so seeds stay ahead of ordinary hub pages.
+    """
+    now = now or datetime.now(timezone.utc)
+    return (
+        CrawlUrl.objects.filter(Q(next_fetch_at__lte=now) | Q(next_fetch_at__isnull=True))
+        .exclude(status__in=PENDING_STATUSES)
+        .update(
+            status="queued",
+            error="",
+            priority=Case(
+                When(is_profile=True, then=Value(settings.CRAWL_PROFILE_PRIORITY)),
+                default=F("priority"),
+            ),
+        )
+    )
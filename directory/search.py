@@ -1,50 +1,128 @@
-from django.db.models import F, FloatField
-from django.db.models.functions import Cast
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
 from django.contrib.postgres.search import SearchQuery, SearchRank
 from pgvector.django import CosineDistance
 
-from .models import Chunk
-from .openai_client import OpenAIClient
+from .cache import query_embedding_cache
+from .models import Chunk, StaffCard, StaffProfile
+from .openai_client import get_openai_client
+from .taxonomy import resolve_units
 
 
-def hybrid_search(query_text, filters=None, limit=20, offset=0):
-    if not query_text:
-        return []
+def resolve_filters(filters):
+    """Turn faculty/institute/department names into lookups on Chunk's unit columns.
 
-    client = OpenAIClient()
-    query_embedding = client.embed_texts([query_text])[0]
+    Returns None when a requested unit does not exist, so callers can skip
+    the search entirely.
+    """
+    units = resolve_units(filters)
+    if units is None:
+        return None
+    return {f"{name}_id__in": ids for name, ids in units.items()}
 
-    filters = filters or {}
-    qs = Chunk.objects.select_related("staff", "staff__faculty", "staff__institute", "staff__department")
 
-    if filters.get("faculty"):
-        qs = qs.filter(staff__faculty__name__iexact=filters["faculty"])
-    if filters.get("institute"):
-        qs = qs.filter(staff__institute__name__iexact=filters["institute"])
-    if filters.get("department"):
-        qs = qs.filter(staff__department__name__iexact=filters["department"])
+def vector_candidates(query_embedding, lookups, k):
+    # ORDER BY embedding <=> q LIMIT k, which Postgres serves from chunk_embedding_hnsw.
+    qs = Chunk.objects.filter(embedding__isnull=False, **lookups)
+    qs = qs.annotate(distance=CosineDistance("embedding", query_embedding)).order_by("distance")
+    with transaction.atomic(), connection.cursor() as cursor:
+        # ef_search caps how many rows one HNSW scan can return.
+        cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", [str(max(settings.SEARCH_HNSW_EF_SEARCH, k))])
+        iterative = settings.SEARCH_HNSW_ITERATIVE_SCAN
+        if lookups and iterative != "off":
+            # Keep scanning the graph until k rows survive the unit filter,
+            # instead of filtering one ef_search-sized batch after the fact.
+            cursor.execute("SELECT set_config('hnsw.iterative_scan', %s, true)", [iterative])
+        hits = list(qs.values_list("id", "distance")[:k])
+    if iterative == "relaxed_order":
+        hits.sort(key=lambda hit: hit[1])
+    return hits
 
+
+def text_candidates(query_text, lookups, k):
+    # tsv @@ query is answered by the GIN index; only the matches are ranked.
     search_query = SearchQuery(query_text)
-    qs = qs.annotate(
-        rank=SearchRank(F("tsv"), search_query),
-        distance=CosineDistance("embedding", query_embedding),
+    qs = Chunk.objects.filter(tsv=search_query, **lookups)
+    qs = qs.annotate(rank=SearchRank(F("tsv"), search_query)).order_by("-rank", "id")
+    return list(qs.values_list("id", "rank")[:k])
+
+
+def fuse_candidates(vector_hits, text_hits, method="rrf", rrf_k=60, vector_weight=0.6, text_weight=0.4):
+    """Combine two ranked candidate lists into {chunk_id: score}.
+
+    ``rrf`` uses reciprocal-rank fusion; ``weighted`` blends the normalised
+    cosine and full-text scores the way the single-stage query used to.
+    """
+    scores = {}
+    if method == "weighted":
+        for chunk_id, distance in vector_hits:
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + vector_weight * (1.0 / (1.0 + float(distance)))
+        for chunk_id, rank in text_hits:
+            rank = float(rank)
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + text_weight * (rank / (1.0 + rank))
+        return scores
+
+    for position, (chunk_id, _) in enumerate(vector_hits, start=1):
+        scores[chunk_id] = scores.get(chunk_id, 0.0) + vector_weight / (rrf_k + position)
+    for position, (chunk_id, _) in enumerate(text_hits, start=1):
+        scores[chunk_id] = scores.get(chunk_id, 0.0) + text_weight / (rrf_k + position)
+    return scores
+
+
+def hybrid_search(query_text, filters=None, limit=20, offset=0):
+    if not query_text:
+        return []
+
+    query_embedding = query_embedding_cache.get_or_embed(
+        query_text,
+        settings.OPENAI_EMBED_MODEL,
+        lambda texts: get_openai_client().embed_texts(texts),
     )
 
-    qs = qs.annotate(
-        vector_score=1.0 / (1.0 + Cast(F("distance"), FloatField())),
-        text_score=F("rank") / (1.0 + F("rank")),
+    lookups = resolve_filters(filters)
+    if lookups is None:
+        return []
+    vector_hits = vector_candidates(query_embedding, lookups, settings.SEARCH_VECTOR_CANDIDATES)
+    text_hits = text_candidates(query_text, lookups, settings.SEARCH_TEXT_CANDIDATES)
+
+    scores = fuse_candidates(
+        vector_hits,
+        text_hits,
+        method=settings.SEARCH_FUSION,
+        rrf_k=settings.SEARCH_RRF_K,
+        vector_weight=settings.SEARCH_VECTOR_WEIGHT,
+        text_weight=settings.SEARCH_TEXT_WEIGHT,
     )
+    if not scores:
+        return []
 
-    qs = qs.annotate(score=0.6 * F("vector_score") + 0.4 * F("text_score"))
+    # Only the columns results render; embeddings and profile text stay in the database.
+    chunks = Chunk.objects.only("id", "staff_id", "chunk_text", "content_hash").in_bulk(list(scores))
+    staff_ids = {chunk.staff_id for chunk in chunks.values()}
+    cards = StaffCard.objects.in_bulk(staff_ids)
+    missing = staff_ids - set(cards)
+    if missing:
+        # Profiles written without save() (bulk or queryset updates) have no card yet.
+        profiles = StaffProfile.objects.select_related("faculty", "institute", "department").defer(
+            "raw_html", "text_content"
+        )
+        for staff in profiles.filter(id__in=missing):
+            cards[staff.id] = staff.sync_card()
 
-    candidates = list(qs.order_by("-score")[:200])
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
     seen = set()
     results = []
-    for chunk in candidates:
+    for chunk_id, score in ranked:
+        chunk = chunks.get(chunk_id)
+        if chunk is None or chunk.staff_id not in cards:
+            continue
         staff_id = chunk.staff_id
         if staff_id in seen:
             continue
         seen.add(staff_id)
+        chunk.card = cards[staff_id]
+        chunk.score = score
         results.append(chunk)
         if len(results) >= (offset + limit):
             break
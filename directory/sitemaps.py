@@ -0,0 +1,210 @@
+import gzip
+import io
+import logging
+import re
+from datetime import timezone
+from urllib.parse import urljoin, urlparse
+
+from dateutil.parser import isoparse
+from django.conf import settings
+from lxml import etree
+
+from .crawler import get_session, is_allowed, normalize_url
+from .models import CrawlUrl
+from .recrawl import PENDING_STATUSES
+
+
+logger = logging.getLogger(__name__)
+
+MAX_SITEMAP_DEPTH = 5
+BATCH_SIZE = 1000
+
+
+def robots_sitemaps(base_url, session=None):
+    """Sitemap URLs listed in a host's robots.txt, or its /sitemap.xml if none are."""
+    session = session or get_session()
+    robots_url = urljoin(base_url, "/robots.txt")
+    sitemaps = []
+    try:
+        response = session.get(robots_url, timeout=20)
+        if response.status_code == 200:
+            for line in response.text.splitlines():
+                key, _, value = line.partition(":")
+                if key.strip().lower() == "sitemap" and value.strip():
+                    sitemaps.append(value.strip())
+    except Exception as exc:
+        logger.warning("Could not read %s: %s", robots_url, exc)
+    return sitemaps or [urljoin(base_url, "/sitemap.xml")]
+
+
+def _localname(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def parse_sitemap(stream):
+    """Yield (kind, loc, lastmod) for each <url> or <sitemap> entry of a sitemap stream.
+
+    The document is parsed incrementally and each entry is freed once read,
+    so memory stays flat however large the sitemap is. Gzipped streams are
+    detected from their magic bytes.
+    """
+    stream = io.BufferedReader(stream) if not hasattr(stream, "peek") else stream
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=stream)
+    for _, elem in etree.iterparse(stream, events=("end",), resolve_entities=False, no_network=True):
+        kind = _localname(elem.tag)
+        if kind not in ("url", "sitemap"):
+            continue
+        fields = {_localname(child.tag): (child.text or "").strip() for child in elem}
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+        if fields.get("loc"):
+            yield kind, fields["loc"], fields.get("lastmod") or None
+
+
+def parse_lastmod(value):
+    if not value:
+        return None
+    try:
+        parsed = isoparse(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _enqueue_entries(entries, counters):
+    """Insert new profile URLs and requeue known ones whose lastmod is newer than our last fetch."""
+    known = {
+        url: (status, last_fetched_at)
+        for url, status, last_fetched_at in CrawlUrl.objects.filter(url__in=list(entries)).values_list(
+            "url", "status", "last_fetched_at"
+        )
+    }
+    new_urls = []
+    changed = []
+    for url, lastmod in entries.items():
+        if url not in known:
+            # Sitemap finds are leaves; BFS from the seeds still covers what the sitemap misses.
+            new_urls.append(
+                CrawlUrl(
+                    url=url,
+                    depth=settings.CRAWL_MAX_DEPTH,
+                    status="queued",
+                    priority=settings.CRAWL_PROFILE_PRIORITY,
+                    is_profile=True,
+                )
+            )
+            continue
+        status, last_fetched_at = known[url]
+        if status in PENDING_STATUSES:
+            counters["known"] += 1
+        elif lastmod and (last_fetched_at is None or lastmod > last_fetched_at):
+            changed.append(url)
+        else:
+            counters["unchanged"] += 1
+    if new_urls:
+        CrawlUrl.objects.bulk_create(new_urls, ignore_conflicts=True)
+    if changed:
+        CrawlUrl.objects.filter(url__in=changed).exclude(status__in=PENDING_STATUSES).update(
+            status="queued",
+            priority=settings.CRAWL_PROFILE_PRIORITY,
+        )
+    counters["inserted"] += len(new_urls)
+    counters["requeued"] += len(changed)
+
+
+def new_discovery(root_urls):
+    """Starting state for discover_profiles; plain JSON so a task can carry it between runs."""
+    return {
+        "pending": [[url, 0] for url in root_urls],
+        "visited": [],
+        "booked": False,
+        "counters": {
+            "sitemaps": 0,
+            "errors": 0,
+            "urls": 0,
+            "matched": 0,
+            "known": 0,
+            "unchanged": 0,
+            "inserted": 0,
+            "requeued": 0,
+        },
+    }
+
+
+def discover_profiles(state, session=None, throttle=None):
+    """Walk sitemaps (and sitemap indexes) from ``state`` and queue staff profile URLs.
+
+    ``throttle`` is called with each sitemap's host before it is fetched; it
+    books the host's next request slot and returns the seconds until it.
+    Rather than sleeping, the walk then stops and returns that wait, with
+    ``state`` updated so the caller can resume it once the slot is due.
+    Returns 0 once every sitemap has been read; counters are in ``state``.
+    """
+    session = session or get_session()
+    keep = re.compile(settings.CRAWL_KEEP_PATH_REGEX)
+    counters = state["counters"]
+    pending = state["pending"]
+    visited = set(state["visited"])
+    entries = {}
+    wait = 0
+
+    while pending:
+        sitemap_url, depth = pending.pop()
+        if sitemap_url in visited or depth > MAX_SITEMAP_DEPTH:
+            continue
+        if throttle and not state["booked"]:
+            wait = throttle(urlparse(sitemap_url).netloc)
+            if wait:
+                pending.append([sitemap_url, depth])
+                state["booked"] = True
+                break
+        state["booked"] = False
+        visited.add(sitemap_url)
+
+        try:
+            with session.get(sitemap_url, timeout=60, stream=True) as response:
+                if response.status_code != 200:
+                    counters["errors"] += 1
+                    continue
+                response.raw.decode_content = True
+                response.raw.auto_close = False
+                counters["sitemaps"] += 1
+                for kind, loc, lastmod in parse_sitemap(response.raw):
+                    if kind == "sitemap":
+                        pending.append([urljoin(sitemap_url, loc), depth + 1])
+                        continue
+                    counters["urls"] += 1
+                    url = normalize_url(loc)
+                    if not is_allowed(url, settings.CRAWL_ALLOWLIST_DOMAIN):
+                        continue
+                    if not keep.match(urlparse(url).path or ""):
+                        continue
+                    counters["matched"] += 1
+                    entries[url] = parse_lastmod(lastmod)
+                    if len(entries) >= BATCH_SIZE:
+                        _enqueue_entries(entries, counters)
+                        entries = {}
+        except Exception as exc:
+            logger.warning("Could not read sitemap %s: %s", sitemap_url, exc)
+            counters["errors"] += 1
+
+    if entries:
+        _enqueue_entries(entries, counters)
+    state["visited"] = sorted(visited)
+    return wait
+
+
+def sitemap_roots(session=None):
+    """Sitemaps configured explicitly plus those advertised by each seed host's robots.txt."""
+    roots = list(settings.CRAWL_SITEMAP_URLS)
+    hosts = {}
+    for seed in [settings.CRAWL_SEED_URL, *settings.CRAWL_SEED_URLS]:
+        parsed = urlparse(normalize_url(seed))
+        hosts.setdefault(parsed.netloc, f"{parsed.scheme}://{parsed.netloc}/")
+    for base_url in hosts.values():
+        roots.extend(robots_sitemaps(base_url, session=session))
+    return list(dict.fromkeys(roots))
@@ -0,0 +1,120 @@
+import logging
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import ChatLog, Chunk, CrawlUrl, SearchLog, StaffProfile
+from .recrawl import PENDING_STATUSES
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "staffsearch:dashboard-stats"
+CRAWL_WINDOW_MINUTES = 5
+SCHEDULE_SECONDS = 60 * 60 * 24 * 7
+LOG_WINDOWS = {"last_24h": 1, "last_7d": 7, "last_30d": 30, "last_365d": 365}
+
+
+def format_duration(seconds):
+    seconds = max(int(seconds), 0)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, sec = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {sec}s"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes}m"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h"
+
+
+def _log_summary(model, now):
+    # One conditional aggregate over the widest window instead of a COUNT per window.
+    return model.objects.filter(created_at__gte=now - timezone.timedelta(days=max(LOG_WINDOWS.values()))).aggregate(
+        **{
+            name: Count("id", filter=Q(created_at__gte=now - timezone.timedelta(days=days)))
+            for name, days in LOG_WINDOWS.items()
+        }
+    )
+
+
+def compute_dashboard_stats():
+    now = timezone.now()
+    window_start = now - timezone.timedelta(minutes=CRAWL_WINDOW_MINUTES)
+
+    status_counts = {}
+    recent_fetches = 0
+    due_urls = 0
+    expired_leases = 0
+    for row in CrawlUrl.objects.values("status").annotate(
+        total=Count("id"),
+        recent=Count("id", filter=Q(last_fetched_at__gte=window_start)),
+        due=Count("id", filter=~Q(status__in=PENDING_STATUSES) & Q(next_fetch_at__lte=now)),
+        expired=Count("id", filter=Q(status="leased", lease_expires_at__lt=now)),
+    ).order_by():
+        status_counts[row["status"]] = row["total"]
+        recent_fetches += row["recent"]
+        due_urls += row["due"]
+        expired_leases += row["expired"]
+
+    staff = StaffProfile.objects.aggregate(count=Count("id"), last_fetch=Max("last_fetched_at"))
+
+    stats = {
+        "staff_count": staff["count"],
+        "queued_urls": status_counts.get("queued", 0),
+        "fetched_urls": status_counts.get("fetched", 0),
+        "error_urls": status_counts.get("error", 0),
+        "total_urls": sum(status_counts.values()),
+        "due_urls": due_urls,
+        "leased_urls": status_counts.get("leased", 0),
+        "expired_leases": expired_leases,
+        "status_counts": status_counts,
+        "chunk_count": Chunk.objects.count(),
+        "last_fetch": staff["last_fetch"],
+        "next_run": staff["last_fetch"] + timezone.timedelta(seconds=SCHEDULE_SECONDS) if staff["last_fetch"] else None,
+    }
+
+    queued = stats["queued_urls"]
+    rate_limit = float(getattr(settings, "CRAWL_RATE_LIMIT", 1.0))
+    concurrency = max(int(getattr(settings, "CRAWL_CONCURRENCY", 1)), 1)
+    predicted_seconds = int((queued * rate_limit) / concurrency) if queued else 0
+    stats["predicted_seconds"] = predicted_seconds
+    stats["predicted_human"] = format_duration(predicted_seconds)
+
+    stats["crawl_requests_per_min"] = round(recent_fetches / CRAWL_WINDOW_MINUTES, 2)
+    stats["crawl_window_minutes"] = CRAWL_WINDOW_MINUTES
+    if stats["crawl_requests_per_min"] > 0:
+        minutes_left_int = int(round(queued / stats["crawl_requests_per_min"]))
+        hours, minutes = divmod(minutes_left_int, 60)
+        stats["queued_eta_minutes"] = minutes_left_int
+        stats["queued_eta_human"] = f"{hours}h {minutes}m" if hours else f"{minutes}m"
+    else:
+        stats["queued_eta_minutes"] = None
+        stats["queued_eta_human"] = "—"
+
+    return {
+        "stats": stats,
+        "search_summary": _log_summary(SearchLog, now),
+        "chat_summary": _log_summary(ChatLog, now),
+        "generated_at": now,
+    }
+
+
+def get_dashboard_stats():
+    """Return the dashboard snapshot, recomputing it at most once per DASHBOARD_STATS_TTL."""
+    try:
+        snapshot = cache.get(CACHE_KEY)
+    except redis.RedisError as exc:
+        logger.warning("Dashboard stats cache unavailable: %s", exc)
+        return compute_dashboard_stats()
+    if snapshot is None:
+        snapshot = compute_dashboard_stats()
+        try:
+            cache.set(CACHE_KEY, snapshot, timeout=settings.DASHBOARD_STATS_TTL)
+        except redis.RedisError as exc:
+            logger.warning("Dashboard stats cache unavailable: %s", exc)
+    return snapshot
@@ -0,0 +1,165 @@
+import logging
+import math
+import uuid
+
+import redis
+from django.conf import settings
+
+from .cache import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "staffsearch:crawl"
+TARGET_KEY = f"{PREFIX}:target"
+WINDOW_KEY = f"{PREFIX}:window"
+
+# Take or refresh a slot unless another chain holds it.
+HOLD_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and current ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+# Drop a slot only if this chain still holds it.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_scripts = {}
+
+
+def _slot_key(slot):
+    return f"{PREFIX}:slot:{slot}"
+
+
+def _script(name, source):
+    if name not in _scripts:
+        _scripts[name] = get_redis().register_script(source)
+    return _scripts[name]
+
+
+def new_token():
+    return uuid.uuid4().hex
+
+
+def current_target():
+    try:
+        value = get_redis().get(TARGET_KEY)
+    except redis.RedisError:
+        value = None
+    return int(value) if value is not None else settings.CRAWL_CONCURRENCY
+
+
+def hold_slot(slot, token, ttl=None):
+    """Refresh this chain's heartbeat on ``slot`` for ``ttl`` seconds (CRAWL_SLOT_TTL by default).
+
+    A chain about to reschedule itself passes CRAWL_SLOT_TTL plus its
+    countdown, so the heartbeat can stay short without expiring while the
+    next step waits. Returns False when the chain should stop: the slot is
+    above the current target or another chain has taken it over.
+    """
+    if slot is None:
+        return True
+    ttl = math.ceil(ttl or settings.CRAWL_SLOT_TTL)
+    try:
+        if slot >= current_target():
+            release_slot(slot, token)
+            return False
+        return bool(_script("hold", HOLD_SCRIPT)(keys=[_slot_key(slot)], args=[token, ttl]))
+    except redis.RedisError as exc:
+        # Without Redis the chain carries on unsupervised, as chains did before.
+        logger.warning("Crawl supervisor unavailable: %s", exc)
+        return True
+
+
+def release_slot(slot, token):
+    if slot is None:
+        return
+    try:
+        _script("release", RELEASE_SCRIPT)(keys=[_slot_key(slot)], args=[token])
+    except redis.RedisError as exc:
+        logger.warning("Crawl supervisor unavailable: %s", exc)
+
+
+def record_fetches(fetches, errors, seconds):
+    if not fetches:
+        return
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hincrby(WINDOW_KEY, "fetches", fetches)
+        pipe.hincrby(WINDOW_KEY, "errors", errors)
+        pipe.hincrbyfloat(WINDOW_KEY, "seconds", seconds)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Crawl supervisor unavailable: %s", exc)
+
+
+def adjust_target(target, fetches, errors, seconds):
+    """Scale the chain count from one window of fetch outcomes.
+
+    Back off by a quarter when fetches are slow or failing, and add one
+    chain at a time while they are fast and clean.
+    """
+    if fetches < settings.CRAWL_SUPERVISOR_MIN_SAMPLES:
+        return target
+    latency = seconds / fetches
+    error_rate = errors / fetches
+    if error_rate > settings.CRAWL_ERROR_RATE_MAX or latency > settings.CRAWL_LATENCY_TARGET:
+        target = int(target * 0.75)
+    elif error_rate <= settings.CRAWL_ERROR_RATE_MAX / 2 and latency <= settings.CRAWL_LATENCY_TARGET / 2:
+        target += 1
+    return min(max(target, settings.CRAWL_CONCURRENCY_MIN), settings.CRAWL_CONCURRENCY_MAX)
+
+
+def supervise(start_chain, has_work):
+    """Retune the target from the last window and start chains for empty slots.
+
+    ``start_chain(slot, token)`` launches a crawl_step chain; ``has_work()``
+    says whether anything is queued. Returns a status dict.
+    """
+    client = get_redis()
+    pipe = client.pipeline()
+    pipe.hgetall(WINDOW_KEY)
+    pipe.delete(WINDOW_KEY)
+    window = {k.decode(): float(v) for k, v in pipe.execute()[0].items()}
+    fetches = int(window.get("fetches", 0))
+    errors = int(window.get("errors", 0))
+    seconds = window.get("seconds", 0.0)
+
+    previous = current_target()
+    target = adjust_target(previous, fetches, errors, seconds)
+    if target != previous:
+        client.set(TARGET_KEY, target)
+        logger.info(
+            "Crawl target %s -> %s (%s fetches, %s errors, %.2fs avg)",
+            previous, target, fetches, errors, seconds / fetches if fetches else 0.0,
+        )
+
+    alive = sum(1 for slot in range(target) if client.exists(_slot_key(slot)))
+    started = 0
+    if alive < target and has_work():
+        for slot in range(target):
+            token = new_token()
+            # Reserve the slot before starting so a concurrent supervisor run cannot double-start it.
+            if client.set(_slot_key(slot), token, ex=settings.CRAWL_SLOT_TTL, nx=True):
+                start_chain(slot, token)
+                started += 1
+    return {"target": target, "alive": alive, "started": started, "fetches": fetches, "errors": errors}
+
+
+def status():
+    """Target and live chain count for the dashboard."""
+    try:
+        client = get_redis()
+        target = current_target()
+        alive = sum(1 for slot in range(settings.CRAWL_CONCURRENCY_MAX) if client.exists(_slot_key(slot)))
+    except redis.RedisError:
+        return None
+    return {"target": target, "alive": alive}
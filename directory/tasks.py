@@ -1,11 +1,14 @@
+import logging
 import re
 import time
 from urllib.parse import urlparse
 from datetime import datetime, timezone
 
+import redis
 from celery import shared_task
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, Value, When
 from django.contrib.postgres.search import SearchVector
 
 from .crawler import (
@@ -13,15 +16,24 @@ from .crawler import (
     is_allowed,
     is_staff_profile_path,
     should_skip_url,
-    extract_links,
-    extract_text_content,
-    extract_staff_fields,
     fetch_url,
+    ParsedPage,
 )
-from .models import CrawlUrl, StaffProfile, Chunk, SeedUrl, CrawlControl, Faculty, Institute, Department
-from .openai_client import OpenAIClient
-from .utils import chunk_text, hash_text
-
+from .models import CrawlUrl, StaffProfile, Chunk, EmbeddingCache, SeedUrl, CrawlControl
+from .openai_client import get_openai_client
+from .analytics import flush_all
+from .cache import LRUCache
+from .frontier import get_frontier
+from .pagestore import collect_garbage, load_page, store_page
+from .ratelimit import HostTokenBucket
+from .recrawl import requeue_due_urls, schedule_next_fetch
+from .sitemaps import discover_profiles, new_discovery, sitemap_roots
+from .supervisor import hold_slot, record_fetches, release_slot, supervise
+from .taxonomy import get_or_create_units
+from .utils import TOKEN_ENCODING, chunk_text, hash_text
+
+
+logger = logging.getLogger(__name__)
 
 KEEP_PATH_REGEX = re.compile(settings.CRAWL_KEEP_PATH_REGEX)
 
@@ -32,14 +44,54 @@ def enqueue_url(url, depth, priority=0):
         return
     if should_skip_url(url):
         return
-    CrawlUrl.objects.get_or_create(url=url, defaults={"depth": depth, "status": "queued", "priority": priority})
-
+    is_profile = is_staff_profile_path(urlparse(url).path or "", KEEP_PATH_REGEX)
+    get_frontier().add(
+        [CrawlUrl(url=url, depth=depth, status="queued", priority=priority, is_profile=is_profile)]
+    )
+
+
+host_bucket = HostTokenBucket(settings.CRAWL_RATE_LIMIT, burst=settings.CRAWL_RATE_BURST)
+
+_seen_urls = LRUCache(maxsize=settings.CRAWL_SEEN_URL_CACHE_SIZE)
+
+
+def enqueue_links(links, depth, priority=0):
+    """Queue discovered links with one batched call to the crawl frontier.
+
+    Links are normalised and filtered in memory, then checked against this
+    worker's seen-set before reaching the frontier. Returns counters for
+    links seen, filtered out, already known and inserted.
+    """
+    counters = {"seen": 0, "filtered": 0, "known": 0, "inserted": 0}
+    candidates = {}
+    for link in links:
+        counters["seen"] += 1
+        url = normalize_url(link)
+        if not is_allowed(url, settings.CRAWL_ALLOWLIST_DOMAIN):
+            counters["filtered"] += 1
+            continue
+        is_staff = is_staff_profile_path(urlparse(url).path or "", KEEP_PATH_REGEX)
+        if not is_staff and should_skip_url(url):
+            counters["filtered"] += 1
+            continue
+        if url in candidates or url in _seen_urls:
+            counters["known"] += 1
+            continue
+        candidates[url] = CrawlUrl(
+            url=url,
+            depth=depth,
+            status="queued",
+            priority=priority + settings.CRAWL_PROFILE_PRIORITY if is_staff else 0,
+            is_profile=is_staff,
+        )
 
-def enqueue_staff_url(url, depth, priority=0):
-    url = normalize_url(url)
-    if not is_allowed(url, settings.CRAWL_ALLOWLIST_DOMAIN):
-        return
-    CrawlUrl.objects.get_or_create(url=url, defaults={"depth": depth, "status": "queued", "priority": priority})
+    if candidates:
+        known, inserted = get_frontier().add(list(candidates.values()))
+        for url in candidates:
+            _seen_urls.set(url, True)
+        counters["known"] += known
+        counters["inserted"] = inserted
+    return counters
 
 
 def enqueue_seed():
@@ -60,113 +112,293 @@ def run_weekly_crawl():
     if control and control.is_paused:
         return
     CrawlUrl.objects.filter(status="staff_queued").update(status="queued")
+    due = requeue_due_urls()
+    logger.info("Requeued %s URLs due for recrawl", due)
     enqueue_seed()
-    for _ in range(settings.CRAWL_CONCURRENCY):
-        crawl_step.delay()
+    if settings.CRAWL_SITEMAP_DISCOVERY:
+        # Discovery starts the crawl itself once the sitemaps are read.
+        discover_sitemap_profiles.delay()
+    else:
+        start_crawl()
 
 
 @shared_task
-def crawl_step():
+def requeue_due_crawl_urls():
+    """Queue URLs whose recrawl interval has passed, between the weekly full runs."""
     control = CrawlControl.objects.first()
     if control and control.is_paused:
-        return
-    with transaction.atomic():
-        url_obj = (
-            CrawlUrl.objects.select_for_update(skip_locked=True)
-            .filter(status="queued")
-            .order_by("-priority", "id")
-            .first()
-        )
-        if not url_obj:
-            return
-        url_obj.status = "fetched"
-        url_obj.save(update_fields=["status"])
+        return 0
+    due = requeue_due_urls()
+    if due:
+        logger.info("Requeued %s URLs due for recrawl", due)
+        start_crawl()
+    return due
 
+
+def start_crawl():
+    synced = get_frontier().sync()
+    if synced:
+        logger.info("Pushed %s queued URLs into the crawl frontier", synced)
+    supervise_crawl()
+
+
+def _book_host_slot(host):
+    _, wait = host_bucket.reserve(host)
+    return wait
+
+
+@shared_task
+def discover_sitemap_profiles(state=None):
+    """Queue staff profiles listed in the seed hosts' sitemaps, then start the crawl.
+
+    When the next sitemap's host slot is not free yet, the task books it and
+    reschedules itself for that time, carrying the walk in ``state``.
+    """
     try:
-        time.sleep(settings.CRAWL_RATE_LIMIT)
-        response = fetch_url(url_obj.url, etag=url_obj.etag, last_modified=url_obj.last_modified)
-        url_obj.http_status = response.status_code
-        url_obj.last_fetched_at = datetime.now(timezone.utc)
+        state = state or new_discovery(sitemap_roots())
+        wait = discover_profiles(state, throttle=_book_host_slot)
+    except Exception:
+        logger.exception("Sitemap discovery failed; falling back to BFS only")
+        start_crawl()
+        return None
+    if wait:
+        discover_sitemap_profiles.apply_async(kwargs={"state": state}, countdown=wait)
+        return None
+    counters = state["counters"]
+    logger.info(
+        "Sitemaps read %(sitemaps)s (%(errors)s errors); profile URLs matched %(matched)s, "
+        "inserted %(inserted)s, requeued %(requeued)s, unchanged %(unchanged)s",
+        counters,
+    )
+    start_crawl()
+    return counters
+
+
+def record_response(url_obj, status_code, headers, html):
+    """Apply a fetch result to ``url_obj`` and hand staff pages on for processing.
+
+    Returns True when the page's links should be followed.
+    """
+    url_obj.http_status = status_code
+    url_obj.last_fetched_at = datetime.now(timezone.utc)
+
+    if status_code == 304:
+        url_obj.status = "skipped"
+        schedule_next_fetch(url_obj, changed=False, now=url_obj.last_fetched_at)
+        return False
+
+    if status_code != 200:
+        url_obj.status = "error"
+        schedule_next_fetch(url_obj, changed=None, now=url_obj.last_fetched_at)
+        return False
 
-        if response.status_code == 304:
-            url_obj.status = "skipped"
-            url_obj.save(update_fields=["http_status", "last_fetched_at", "status"])
-            return
+    previous_hash = url_obj.content_hash
+    url_obj.etag = headers.get("ETag", "")
+    url_obj.last_modified = headers.get("Last-Modified", "")
+    url_obj.content_hash = hash_text(html)
+    changed = url_obj.content_hash != previous_hash if previous_hash else None
+    schedule_next_fetch(url_obj, changed=changed, now=url_obj.last_fetched_at)
 
-        if response.status_code != 200:
-            url_obj.status = "error"
-            url_obj.save(update_fields=["http_status", "last_fetched_at", "status"])
-            return
+    parsed_path = urlparse(url_obj.url).path or ""
+    if is_staff_profile_path(parsed_path, KEEP_PATH_REGEX):
+        process_staff_page.delay(url_obj.url, store_page(html))
+
+    url_obj.status = "fetched"
+    return url_obj.depth < settings.CRAWL_MAX_DEPTH
+
+
+def crawl_url(url_obj):
+    """Fetch one claimed URL and record the outcome on ``url_obj`` without saving it.
 
-        html = response.text
-        url_obj.etag = response.headers.get("ETag", "")
-        url_obj.last_modified = response.headers.get("Last-Modified", "")
-
-        parsed_path = urlparse(url_obj.url).path or ""
-        if is_staff_profile_path(parsed_path, KEEP_PATH_REGEX):
-            process_staff_page.delay(url_obj.url, html)
-
-        links = extract_links(html, url_obj.url)
-        if url_obj.depth < settings.CRAWL_MAX_DEPTH:
-            for link in links:
-                if is_allowed(link, settings.CRAWL_ALLOWLIST_DOMAIN):
-                    link_path = urlparse(link).path or ""
-                    if is_staff_profile_path(link_path, KEEP_PATH_REGEX):
-                        enqueue_staff_url(link, url_obj.depth + 1, priority=url_obj.priority + 5)
-                    else:
-                        enqueue_url(link, url_obj.depth + 1)
-
-        url_obj.status = "fetched"
-        url_obj.save(update_fields=["http_status", "etag", "last_modified", "last_fetched_at", "status"])
+    Returns the link counters from enqueue_links, or None if no links were followed.
+    """
+    link_counters = None
+    url_obj.error = ""
+    try:
+        response = fetch_url(url_obj.url, etag=url_obj.etag, last_modified=url_obj.last_modified)
+        html = response.text if response.status_code == 200 else ""
+        if record_response(url_obj, response.status_code, response.headers, html):
+            links = ParsedPage(html, url_obj.url).links
+            link_counters = enqueue_links(links, url_obj.depth + 1, priority=url_obj.priority)
     except Exception as exc:
         url_obj.status = "error"
         url_obj.error = str(exc)
-        url_obj.save(update_fields=["status", "error"])
-    finally:
-        control = CrawlControl.objects.first()
-        if control and control.is_paused:
-            return
-        if CrawlUrl.objects.filter(status="queued").exists():
-            crawl_step.delay()
+    return link_counters
 
 
-@shared_task
-def process_staff_page(url, html):
-    url = normalize_url(url)
-    text_content = extract_text_content(html)
-    content_hash = hash_text(text_content)
+def _is_fetch_failure(url_obj):
+    # Failures that suggest we are pushing the site too hard, not pages that are simply missing.
+    status = url_obj.http_status or 0
+    return bool(url_obj.error) or status == 429 or status >= 500
 
-    fields = extract_staff_fields(html, base_url=url)
 
-    staff, created = StaffProfile.objects.get_or_create(profile_url=url)
+def _hand_back(frontier, url_objs):
+    for url_obj in url_objs:
+        url_obj.status = "queued"
+    if url_objs:
+        frontier.complete(url_objs)
 
-    # Fetch and append tabbed content pages (e.g., /research#tabbed-content)
+
+@shared_task
+def crawl_step(slot=None, token=None, pending=None, batch_size=None):
+    """Crawl one batch, then re-schedule the chain on the same supervisor slot.
+
+    Each claimed URL books its host's next request slot up to
+    CRAWL_RESERVE_HORIZON seconds ahead. URLs whose slot has come round are
+    fetched now; the rest stay leased and travel in ``pending`` as
+    ``[id, due]`` pairs to the chain's next step, which is scheduled for the
+    earliest slot. URLs that could not be booked go back to the queue and
+    the next claim is shrunk to what the hosts could take.
+    """
+    frontier = get_frontier()
+    owner = f"crawl_step:{token}" if token else None
+    batch_size = batch_size or settings.CRAWL_BATCH_SIZE
+    control = CrawlControl.objects.first()
+    if control and control.is_paused:
+        if pending:
+            _hand_back(frontier, frontier.resume([pk for pk, _ in pending], owner=owner))
+        release_slot(slot, token)
+        return
+    if not hold_slot(slot, token):
+        if pending:
+            _hand_back(frontier, frontier.resume([pk for pk, _ in pending], owner=owner))
+        return
+
+    handed_back = []
+    retry_in = 0
+    if pending:
+        due_at = dict(pending)
+        url_objs = frontier.resume(list(due_at), owner=owner)
+    else:
+        url_objs = frontier.claim(batch_size, owner=owner)
+        if not url_objs:
+            release_slot(slot, token)
+            return
+        due_at = {}
+        now = time.time()
+        for url_obj in url_objs:
+            booked, wait = host_bucket.reserve(urlparse(url_obj.url).netloc, settings.CRAWL_RESERVE_HORIZON)
+            if booked:
+                due_at[url_obj.id] = now + wait
+            else:
+                handed_back.append(url_obj)
+                # Come back once the host's slots are within reach again.
+                retry_in = max(retry_in, wait - settings.CRAWL_RESERVE_HORIZON)
+        batch_size = max(len(due_at), 1) if handed_back else min(batch_size * 2, settings.CRAWL_BATCH_SIZE)
+        for url_obj in handed_back:
+            url_obj.status = "queued"
+
+    booked = sorted((url_obj for url_obj in url_objs if url_obj.id in due_at), key=lambda u: due_at[u.id])
+    fetched = []
+    link_totals = {"seen": 0, "filtered": 0, "known": 0, "inserted": 0}
+    failures = 0
+    fetch_seconds = 0.0
     try:
-        links = extract_links(html, url)
-        tabbed_links = []
-        for link in links:
-            if "#tabbed-content" in link:
-                tabbed_links.append(link.split("#", 1)[0])
-        tabbed_links = list(dict.fromkeys(tabbed_links))
-
-        extra_texts = []
-        extra_html = []
-        for link in tabbed_links:
-            if not is_allowed(link, settings.CRAWL_ALLOWLIST_DOMAIN):
-                continue
-            time.sleep(settings.CRAWL_RATE_LIMIT)
+        for url_obj in booked:
+            # Never sleep for a slot; later slots are left for the next step.
+            if due_at[url_obj.id] > time.time():
+                break
+            started_at = time.monotonic()
+            link_counters = crawl_url(url_obj)
+            fetch_seconds += time.monotonic() - started_at
+            fetched.append(url_obj)
+            failures += _is_fetch_failure(url_obj)
+            for key, value in (link_counters or {}).items():
+                link_totals[key] += value
+    finally:
+        frontier.complete(fetched + handed_back)
+        record_fetches(len(fetched), failures, fetch_seconds)
+        later = [[url_obj.id, due_at[url_obj.id]] for url_obj in booked[len(fetched):]]
+        control = CrawlControl.objects.first()
+        paused = control and control.is_paused
+        if later and not paused:
+            countdown = max(later[0][1] - time.time(), 0)
+            # Keep the slot through the countdown; a short heartbeat alone would lapse while we wait.
+            if hold_slot(slot, token, ttl=settings.CRAWL_SLOT_TTL + countdown):
+                crawl_step.apply_async(
+                    kwargs={"slot": slot, "token": token, "pending": later, "batch_size": batch_size},
+                    countdown=countdown,
+                )
+            else:
+                _hand_back(frontier, booked[len(fetched):])
+        elif not paused and frontier.has_work():
+            if hold_slot(slot, token, ttl=settings.CRAWL_SLOT_TTL + retry_in):
+                crawl_step.apply_async(
+                    kwargs={"slot": slot, "token": token, "batch_size": batch_size},
+                    countdown=retry_in,
+                )
+        else:
+            _hand_back(frontier, booked[len(fetched):])
+            release_slot(slot, token)
+    logger.info(
+        "Crawled %s URLs (%s booked for later, %s handed back); links seen %s, filtered %s, known %s, inserted %s",
+        len(fetched), len(booked) - len(fetched), len(handed_back),
+        link_totals["seen"], link_totals["filtered"], link_totals["known"], link_totals["inserted"],
+    )
+    return link_totals
+
+
+# Each attempt fetches at least one booked tab page, so a handful of spare retries is enough.
+TAB_FETCH_SPARE_RETRIES = 3
+
+
+@shared_task(bind=True)
+def process_staff_page(self, url, page_ref, tab_refs=None, booked=False):
+    """Parse a fetched profile, append its tabbed pages and save it.
+
+    Tab pages are fetched in order under the host rate limit. When the next
+    one's slot is not free yet, the slot is booked and the task retries at
+    that time, carrying the pages fetched so far in ``tab_refs`` (link to
+    page-store reference, "" for a failed fetch) instead of starting over.
+    """
+    url = normalize_url(url)
+    html = load_page(page_ref)
+    page = ParsedPage(html, url)
+    text_content = page.text_content
+    fields = page.staff_fields
+
+    # Fetch and append tabbed content pages (e.g., /research#tabbed-content)
+    tabbed_links = []
+    for link in page.links:
+        if "#tabbed-content" in link:
+            tabbed_links.append(link.split("#", 1)[0])
+    tabbed_links = [link for link in dict.fromkeys(tabbed_links) if is_allowed(link, settings.CRAWL_ALLOWLIST_DOMAIN)]
+
+    tab_refs = dict(tab_refs or {})
+    for link in tabbed_links:
+        if link in tab_refs:
+            continue
+        if not booked:
+            booked, wait = host_bucket.reserve(urlparse(link).netloc, settings.CRAWL_RESERVE_HORIZON)
+            if wait or not booked:
+                if self.request.retries < len(tabbed_links) + TAB_FETCH_SPARE_RETRIES:
+                    # args=() so the retry does not also replay the positional args it was queued with.
+                    raise self.retry(
+                        args=(),
+                        kwargs={"url": url, "page_ref": page_ref, "tab_refs": tab_refs, "booked": booked},
+                        countdown=wait if booked else wait - settings.CRAWL_RESERVE_HORIZON,
+                        max_retries=None,
+                    )
+                logger.warning("Giving up on %s tabbed pages of %s", len(tabbed_links) - len(tab_refs), url)
+                break
+        booked = False
+        tab_refs[link] = ""
+        try:
             resp = fetch_url(link)
-            if resp.status_code != 200:
-                continue
-            extra_html.append(resp.text)
-            extra_texts.append(extract_text_content(resp.text))
-
-        if extra_texts:
-            text_content = text_content + "\n\n" + "\n\n".join(extra_texts)
-            html = html + "\n\n" + "\n\n".join(extra_html)
-    except Exception:
-        pass
+            if resp.status_code == 200:
+                tab_refs[link] = store_page(resp.text)
+        except Exception:
+            continue
+
+    tab_pages = [(link, load_page(tab_refs[link])) for link in tabbed_links if tab_refs.get(link)]
+    extra_html = [tab_html for _, tab_html in tab_pages]
+    extra_texts = [ParsedPage(tab_html, link).text_content for link, tab_html in tab_pages]
 
+    if extra_texts:
+        text_content = text_content + "\n\n" + "\n\n".join(extra_texts)
+        html = html + "\n\n" + "\n\n".join(extra_html)
+
+    staff, created = StaffProfile.objects.defer("raw_html").get_or_create(profile_url=url)
     content_hash = hash_text(text_content)
     if not created and staff.content_hash == content_hash:
         return
@@ -175,28 +407,7 @@ def process_staff_page(url, html):
     institute_name = (fields.get("institute", "") or "").strip()
     department_name = (fields.get("department", "") or "").strip()
 
-    faculty = None
-    institute = None
-    department = None
-
-    if faculty_name:
-        faculty, _ = Faculty.objects.get_or_create(name=faculty_name)
-    if institute_name:
-        institute, _ = Institute.objects.get_or_create(
-            name=institute_name,
-            defaults={"faculty": faculty},
-        )
-        if faculty and institute.faculty_id != faculty.id:
-            institute.faculty = faculty
-            institute.save(update_fields=["faculty"])
-    if department_name:
-        department, _ = Department.objects.get_or_create(
-            name=department_name,
-            defaults={"institute": institute},
-        )
-        if institute and department.institute_id != institute.id:
-            department.institute = institute
-            department.save(update_fields=["institute"])
+    faculty, institute, department = get_or_create_units(faculty_name, institute_name, department_name)
 
     staff.name = fields.get("name", "")
     staff.title = fields.get("title", "")
@@ -208,9 +419,12 @@ def process_staff_page(url, html):
     staff.institute_text = institute_name
     staff.department_text = department_name
     staff.text_content = text_content
-    staff.raw_html = html
+    # The bare page is already in the store under page_ref; only tabbed pages need a new blob.
+    staff.raw_html_hash = store_page(html) if extra_html else page_ref
+    staff.raw_html = ""
     staff.content_hash = content_hash
     staff.save()
+    staff.sync_chunk_units()
 
     embed_staff_profile.delay(staff.id)
 
@@ -221,32 +435,233 @@ def embed_staff_profile(staff_id):
     chunks = chunk_text(staff.text_content, max_tokens=800, overlap=200)
     if not chunks:
         return
+    hashes = [hash_text(chunk) for chunk in chunks]
+    model = settings.OPENAI_EMBED_MODEL
+
+    # Match existing rows by chunk hash; unchanged chunks keep their row and HNSW entry.
+    existing = {}
+    for row in Chunk.objects.filter(staff=staff).only("id", "chunk_index", "content_hash"):
+        existing.setdefault(row.content_hash, []).append(row)
+
+    reindexed = []
+    kept = 0
+    new_positions = []
+    for idx, chunk_hash in enumerate(hashes):
+        rows = existing.get(chunk_hash)
+        if rows:
+            row = rows.pop()
+            kept += 1
+            if row.chunk_index != idx:
+                row.chunk_index = idx
+                reindexed.append(row)
+        else:
+            new_positions.append(idx)
+    stale_ids = [row.id for rows in existing.values() for row in rows]
+
+    # New chunks take a cached vector when one exists; the rest are left pending
+    # for embed_pending_chunks to batch with other profiles.
+    needed = list(dict.fromkeys(hashes[idx] for idx in new_positions))
+    embeddings = dict(
+        EmbeddingCache.objects.filter(model=model, content_hash__in=needed).values_list("content_hash", "embedding")
+    )
+    cached = sum(1 for idx in new_positions if hashes[idx] in embeddings)
 
-    client = OpenAIClient()
-    embeddings = client.embed_texts(chunks)
+    with transaction.atomic():
+        if stale_ids:
+            Chunk.objects.filter(id__in=stale_ids).delete()
+        if reindexed:
+            Chunk.objects.bulk_update(reindexed, ["chunk_index"], batch_size=100)
+        created = Chunk.objects.bulk_create(
+            [
+                Chunk(
+                    staff=staff,
+                    faculty_id=staff.faculty_id,
+                    institute_id=staff.institute_id,
+                    department_id=staff.department_id,
+                    chunk_index=idx,
+                    chunk_text=chunks[idx],
+                    content_hash=hashes[idx],
+                    embedding=embeddings.get(hashes[idx]),
+                )
+                for idx in new_positions
+            ],
+            batch_size=100,
+        )
+        if created:
+            Chunk.objects.filter(id__in=[c.id for c in created]).update(tsv=SearchVector("chunk_text"))
+
+    result = {
+        "staff_id": staff.id,
+        "chunks": len(chunks),
+        "reused": kept + cached,
+        "queued": len(new_positions) - cached,
+        "deleted": len(stale_ids),
+    }
+    logger.info("Embedded staff %(staff_id)s: %(reused)s reused, %(queued)s queued, %(deleted)s deleted", result)
+    return result
+
+
+def claim_pending_chunks(limit, claim_seconds=None):
+    """Reserve up to ``limit`` unembedded chunks for this worker and commit straight away.
+
+    The claim is a timestamp rather than a row lock, so no transaction stays
+    open while the embeddings API is called; a worker that dies leaves its
+    chunks to be claimed again once the claim runs out.
+    """
+    claim_seconds = claim_seconds or settings.EMBED_CLAIM_SECONDS
+    table = connection.ops.quote_name(Chunk._meta.db_table)
+    sql = (
+        f"UPDATE {table} SET embed_claimed_until = now() + make_interval(secs => %s) "
+        f"WHERE id IN ("
+        f"SELECT id FROM {table} WHERE embedding IS NULL "
+        f"AND (embed_claimed_until IS NULL OR embed_claimed_until < now()) "
+        f"ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED"
+        f") RETURNING id, chunk_text, content_hash"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [claim_seconds, limit])
+        rows = cursor.fetchall()
+    rows.sort()
+    return [Chunk(id=pk, chunk_text=text, content_hash=content_hash) for pk, text, content_hash in rows]
+
+
+def release_chunks(ids):
+    if ids:
+        Chunk.objects.filter(id__in=ids).update(embed_claimed_until=None)
+
+
+def save_chunk_embeddings(rows):
+    """Write embeddings only to chunks that still exist with the content they were embedded from."""
+    embedding_field = Chunk._meta.get_field("embedding")
+    for start in range(0, len(rows), 100):
+        batch = rows[start:start + 100]
+        Chunk.objects.filter(id__in=[row.id for row in batch]).update(
+            embedding=Case(
+                *[
+                    When(
+                        Q(id=row.id, content_hash=row.content_hash),
+                        then=Value(row.embedding, output_field=embedding_field),
+                    )
+                    for row in batch
+                ],
+                default=F("embedding"),
+            ),
+            embed_claimed_until=None,
+        )
 
-    Chunk.objects.filter(staff=staff).delete()
 
-    chunk_objs = []
-    for idx, chunk in enumerate(chunks):
-        chunk_objs.append(
-            Chunk(
-                staff=staff,
-                chunk_index=idx,
-                chunk_text=chunk,
-                embedding=embeddings[idx],
-            )
+@shared_task
+def embed_pending_chunks():
+    """Embed pending chunks from any profile in requests packed to the token and item budgets."""
+    model = settings.OPENAI_EMBED_MODEL
+    max_tokens = settings.EMBED_BATCH_MAX_TOKENS
+    max_items = settings.EMBED_BATCH_MAX_ITEMS
+    totals = {"batches": 0, "chunks": 0, "requested": 0, "tokens": 0, "seconds": 0.0}
+
+    while True:
+        rows = claim_pending_chunks(max_items)
+        if not rows:
+            break
+
+        started_at = time.perf_counter()
+        embeddings = dict(
+            EmbeddingCache.objects.filter(
+                model=model, content_hash__in={row.content_hash for row in rows}
+            ).values_list("content_hash", "embedding")
         )
 
-    Chunk.objects.bulk_create(chunk_objs, batch_size=100)
-
-    Chunk.objects.filter(staff=staff).update(tsv=SearchVector("chunk_text"))
+        texts = {}
+        tokens = 0
+        batch = []
+        for row in rows:
+            if row.content_hash not in embeddings and row.content_hash not in texts:
+                count = len(TOKEN_ENCODING.encode(row.chunk_text))
+                if texts and tokens + count > max_tokens:
+                    break
+                texts[row.content_hash] = row.chunk_text
+                tokens += count
+            batch.append(row)
+        # Rows that did not fit this request go back for the next claim.
+        release_chunks([row.id for row in rows[len(batch):]])
+
+        if texts:
+            try:
+                fresh = dict(zip(texts, get_openai_client().embed_texts(list(texts.values()))))
+            except Exception:
+                release_chunks([row.id for row in batch])
+                raise
+            EmbeddingCache.objects.bulk_create(
+                [EmbeddingCache(content_hash=chunk_hash, model=model, embedding=vector) for chunk_hash, vector in fresh.items()],
+                ignore_conflicts=True,
+            )
+            embeddings.update(fresh)
 
+        for row in batch:
+            row.embedding = embeddings[row.content_hash]
+        save_chunk_embeddings(batch)
 
-@shared_task
-def fetch_and_process_profile(url):
-    time.sleep(settings.CRAWL_RATE_LIMIT)
+        elapsed = time.perf_counter() - started_at
+        logger.info(
+            "Embedding batch: %s chunks, %s inputs, %s tokens in %.2fs (%.1f chunks/s)",
+            len(batch), len(texts), tokens, elapsed, len(batch) / max(elapsed, 0.001),
+        )
+        totals["batches"] += 1
+        totals["chunks"] += len(batch)
+        totals["requested"] += len(texts)
+        totals["tokens"] += tokens
+        totals["seconds"] += elapsed
+
+    totals["chunks_per_second"] = round(totals["chunks"] / max(totals["seconds"], 0.001), 1)
+    return totals
+
+
+@shared_task(bind=True)
+def fetch_and_process_profile(self, url, booked=False):
+    if not booked:
+        booked, wait = host_bucket.reserve(urlparse(url).netloc)
+        if wait:
+            # The slot is ours; come back when it is due rather than competing for it again.
+            raise self.retry(args=(), kwargs={"url": url, "booked": True}, countdown=wait, max_retries=1)
     response = fetch_url(url)
     if response.status_code != 200:
         return
-    process_staff_page.delay(url, response.text)
+    process_staff_page.delay(url, store_page(response.text))
+
+
+@shared_task
+def collect_page_garbage():
+    return collect_garbage(settings.PAGE_STORE_GC_GRACE)
+
+
+@shared_task
+def flush_analytics():
+    return flush_all(batch_size=settings.ANALYTICS_FLUSH_BATCH)
+
+
+@shared_task
+def reap_crawl_leases():
+    reaped = get_frontier().reap()
+    if not reaped:
+        return 0
+    # The chains that held these leases are gone; supervise_crawl starts replacements.
+    logger.warning("Returned %s URLs with expired leases to the queue", reaped)
+    return reaped
+
+
+@shared_task
+def supervise_crawl():
+    """Keep the number of live crawl_step chains at the adaptive target."""
+    control = CrawlControl.objects.first()
+    if control and control.is_paused:
+        return None
+    try:
+        result = supervise(
+            start_chain=lambda slot, token: crawl_step.delay(slot=slot, token=token),
+            has_work=get_frontier().has_work,
+        )
+    except redis.RedisError as exc:
+        logger.warning("Crawl supervisor unavailable: %s", exc)
+        return None
+    if result["started"]:
+        logger.info("Started %(started)s crawl chains (%(alive)s alive, target %(target)s)", result)
+    return result
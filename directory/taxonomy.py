@@ -0,0 +1,163 @@
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Department, Faculty, Institute
+
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "staffsearch:taxonomy:version"
+SNAPSHOT_KEY = "staffsearch:taxonomy:{version}"
+
+# (version, snapshot) for this process; replaced as a whole so readers never see a mix.
+_local = (None, None)
+
+
+def current_version():
+    """Return the shared taxonomy version, or None when the cache is unavailable."""
+    try:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # Start from the clock so a flushed cache never reuses an old version number.
+            cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = cache.get(VERSION_KEY)
+        return version
+    except redis.RedisError as exc:
+        logger.warning("Taxonomy cache unavailable: %s", exc)
+        return None
+
+
+def bump_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        return current_version()
+    except redis.RedisError as exc:
+        logger.warning("Taxonomy cache unavailable: %s", exc)
+        return None
+
+
+def build_snapshot():
+    return {
+        "faculties": list(Faculty.objects.order_by("name").values("id", "name")),
+        "institutes": list(Institute.objects.order_by("name").values("id", "name", "faculty_id")),
+        "departments": list(Department.objects.order_by("name").values("id", "name", "institute_id")),
+    }
+
+
+def get_snapshot():
+    """Return (version, snapshot), reading through the process copy and then the shared cache."""
+    global _local
+    version = current_version()
+    if version is None:
+        return None, build_snapshot()
+    local_version, snapshot = _local
+    if local_version == version:
+        return version, snapshot
+
+    key = SNAPSHOT_KEY.format(version=version)
+    try:
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = build_snapshot()
+            cache.set(key, snapshot, timeout=settings.TAXONOMY_CACHE_TTL)
+    except redis.RedisError as exc:
+        logger.warning("Taxonomy cache unavailable: %s", exc)
+        return None, build_snapshot()
+    _local = (version, snapshot)
+    return version, snapshot
+
+
+def filter_options(snapshot, faculty="", institute=""):
+    """Names for the faculty, institute and department dropdowns given the current selection."""
+    faculty = faculty.casefold()
+    institute = institute.casefold()
+    faculty_names = {row["id"]: row["name"] for row in snapshot["faculties"]}
+    institute_rows = snapshot["institutes"]
+    if faculty:
+        institute_rows = [
+            row for row in institute_rows
+            if faculty_names.get(row["faculty_id"], "").casefold() == faculty
+        ]
+    institute_names = {row["id"]: row["name"] for row in snapshot["institutes"]}
+
+    department_rows = snapshot["departments"]
+    if institute:
+        department_rows = [
+            row for row in department_rows
+            if institute_names.get(row["institute_id"], "").casefold() == institute
+        ]
+    elif faculty:
+        faculty_institutes = {row["id"] for row in institute_rows}
+        department_rows = [row for row in department_rows if row["institute_id"] in faculty_institutes]
+
+    return {
+        "faculties": sorted(faculty_names.values()),
+        "institutes": sorted(row["name"] for row in institute_rows),
+        "departments": sorted(row["name"] for row in department_rows),
+    }
+
+
+def resolve_units(filters):
+    """Map faculty/institute/department filter names to lists of unit ids.
+
+    Returns None when a requested unit does not exist.
+    """
+    _, snapshot = get_snapshot()
+    resolved = {}
+    for name, rows in (
+        ("faculty", snapshot["faculties"]),
+        ("institute", snapshot["institutes"]),
+        ("department", snapshot["departments"]),
+    ):
+        value = ((filters or {}).get(name) or "").strip().casefold()
+        if not value:
+            continue
+        ids = [row["id"] for row in rows if row["name"].casefold() == value]
+        if not ids:
+            return None
+        resolved[name] = ids
+    return resolved
+
+
+def get_or_create_units(faculty_name, institute_name, department_name):
+    """Find or create a profile's units, re-parenting them to match the page.
+
+    Bumps the taxonomy version whenever a unit is created or moved.
+    """
+    faculty = None
+    institute = None
+    department = None
+    changed = False
+
+    if faculty_name:
+        faculty, created = Faculty.objects.get_or_create(name=faculty_name)
+        changed |= created
+    if institute_name:
+        institute, created = Institute.objects.get_or_create(
+            name=institute_name,
+            defaults={"faculty": faculty},
+        )
+        changed |= created
+        if faculty and institute.faculty_id != faculty.id:
+            institute.faculty = faculty
+            institute.save(update_fields=["faculty"])
+            changed = True
+    if department_name:
+        department, created = Department.objects.get_or_create(
+            name=department_name,
+            defaults={"institute": institute},
+        )
+        changed |= created
+        if institute and department.institute_id != institute.id:
+            department.institute = institute
+            department.save(update_fields=["institute"])
+            changed = True
+
+    if changed:
+        bump_version()
+    return faculty, institute, department
@@ -5,6 +5,7 @@ urlpatterns = [
     path("", views.index, name="index"),
     path("embed/", views.embed, name="embed"),
     path("admin-dashboard/", views.admin_dashboard, name="admin_dashboard"),
+    path("admin-dashboard/stats/", views.admin_dashboard_stats, name="admin_dashboard_stats"),
     path("admin-dashboard/run-crawl/", views.admin_run_crawl, name="admin_run_crawl"),
     path("admin-dashboard/seeds/add/", views.admin_seed_add, name="admin_seed_add"),
     path("admin-dashboard/seeds/delete/", views.admin_seed_delete, name="admin_seed_delete"),
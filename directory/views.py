@@ -1,20 +1,28 @@
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import JsonResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_GET, require_POST
-from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
 from urllib.parse import urlparse
 import re
 from django.conf import settings
+from django.db.models import Q
 from functools import wraps
 
+import base64
 import json
 
-from .models import StaffProfile, CrawlUrl, Chunk, SeedUrl, CrawlControl, Faculty, Institute, Department, SearchLog, ChatLog
+from .models import StaffProfile, SeedUrl, CrawlControl, SearchLog, ChatLog
 from .crawler import normalize_url, is_allowed, is_staff_profile_path
 from .tasks import fetch_and_process_profile
-from .openai_client import OpenAIClient
+from .openai_client import OpenAIUnavailable, get_openai_client
 from .search import hybrid_search
+from .analytics import buffer_stats, record_chat, record_search
+from .cache import chat_answer_key, get_chat_answer, query_embedding_cache, set_chat_answer
+from .stats import get_dashboard_stats
+from .frontier import status as crawl_frontier_status
+from .supervisor import status as crawl_supervisor_status
+from .taxonomy import current_version, filter_options, get_snapshot, resolve_units
 
 
 @require_GET
@@ -41,96 +49,50 @@ def staff_required(view_func):
     return _wrapped
 
 
-@require_GET
-@staff_required
-def admin_dashboard(request):
-    stats = {
-        "staff_count": StaffProfile.objects.count(),
-    }
-    stats.update({
-        "queued_urls": CrawlUrl.objects.filter(status="queued").count(),
-        "fetched_urls": CrawlUrl.objects.filter(status="fetched").count(),
-        "error_urls": CrawlUrl.objects.filter(status="error").count(),
-        "total_urls": CrawlUrl.objects.count(),
-        "chunk_count": Chunk.objects.count(),
-    })
-    queued = stats["queued_urls"]
-    rate_limit = float(getattr(settings, "CRAWL_RATE_LIMIT", 1.0))
-    concurrency = max(int(getattr(settings, "CRAWL_CONCURRENCY", 1)), 1)
-    predicted_seconds = int((queued * rate_limit) / concurrency) if queued else 0
-    stats["predicted_seconds"] = predicted_seconds
-    stats["predicted_human"] = _format_duration(predicted_seconds)
-    last_fetch = StaffProfile.objects.exclude(last_fetched_at=None).order_by("-last_fetched_at").values_list("last_fetched_at", flat=True).first()
-    stats["last_fetch"] = last_fetch
-
-    schedule_seconds = 60 * 60 * 24 * 7
-    if last_fetch:
-        stats["next_run"] = last_fetch + timezone.timedelta(seconds=schedule_seconds)
-    else:
-        stats["next_run"] = None
-
+def _dashboard_stats():
+    snapshot = get_dashboard_stats()
+    stats = dict(snapshot["stats"])
     control, _ = CrawlControl.objects.get_or_create(id=1, defaults={"is_paused": False})
     stats["is_paused"] = control.is_paused
     stats["in_progress"] = stats["queued_urls"] > 0 and not control.is_paused
-
-    now = timezone.now()
-    window_minutes = 5
-    recent_fetches = CrawlUrl.objects.filter(
-        last_fetched_at__gte=now - timezone.timedelta(minutes=window_minutes)
-    ).count()
-    stats["crawl_requests_per_min"] = round(recent_fetches / window_minutes, 2)
-    stats["crawl_window_minutes"] = window_minutes
-    if stats["crawl_requests_per_min"] > 0:
-        minutes_left = stats["queued_urls"] / stats["crawl_requests_per_min"]
-        minutes_left_int = int(round(minutes_left))
-        hours, minutes = divmod(minutes_left_int, 60)
-        stats["queued_eta_minutes"] = minutes_left_int
-        stats["queued_eta_human"] = f"{hours}h {minutes}m" if hours else f"{minutes}m"
-    else:
-        stats["queued_eta_minutes"] = None
-        stats["queued_eta_human"] = "—"
-    recent_searches = SearchLog.objects.order_by("-created_at")[:100]
-    recent_chats = ChatLog.objects.order_by("-created_at")[:20]
-    search_summary = {
-        "last_24h": SearchLog.objects.filter(created_at__gte=now - timezone.timedelta(days=1)).count(),
-        "last_7d": SearchLog.objects.filter(created_at__gte=now - timezone.timedelta(days=7)).count(),
-        "last_30d": SearchLog.objects.filter(created_at__gte=now - timezone.timedelta(days=30)).count(),
-        "last_365d": SearchLog.objects.filter(created_at__gte=now - timezone.timedelta(days=365)).count(),
-    }
-    chat_summary = {
-        "last_24h": ChatLog.objects.filter(created_at__gte=now - timezone.timedelta(days=1)).count(),
-        "last_7d": ChatLog.objects.filter(created_at__gte=now - timezone.timedelta(days=7)).count(),
-        "last_30d": ChatLog.objects.filter(created_at__gte=now - timezone.timedelta(days=30)).count(),
-        "last_365d": ChatLog.objects.filter(created_at__gte=now - timezone.timedelta(days=365)).count(),
+    embed_cache = query_embedding_cache.stats()
+    stats["embed_cache_hit_pct"] = round(embed_cache["hit_rate"] * 100, 1)
+    stats["embed_cache_lookups"] = embed_cache["lookups"]
+    stats["analytics"] = buffer_stats()
+    stats["crawl_workers"] = crawl_supervisor_status()
+    stats["frontier"] = crawl_frontier_status()
+    if stats["frontier"] and "leased" in stats["frontier"]:
+        # Redis leases never reach the CrawlUrl table, so report them from the frontier.
+        stats["leased_urls"] = stats["frontier"]["leased"]
+        stats["expired_leases"] = stats["frontier"]["expired"]
+    try:
+        stats["openai"] = get_openai_client().metrics()
+    except RuntimeError:
+        stats["openai"] = None
+    return {
+        "stats": stats,
+        "search_summary": snapshot["search_summary"],
+        "chat_summary": snapshot["chat_summary"],
+        "generated_at": snapshot["generated_at"],
     }
-    return render(
-        request,
-        "directory/admin_dashboard.html",
-        {
-            "stats": stats,
-            "recent_searches": recent_searches,
-            "recent_chats": recent_chats,
-            "search_summary": search_summary,
-            "chat_summary": chat_summary,
-        },
-    )
 
 
-KEEP_PATH_REGEX = re.compile(settings.CRAWL_KEEP_PATH_REGEX)
+@require_GET
+@staff_required
+def admin_dashboard(request):
+    context = _dashboard_stats()
+    context["recent_searches"] = SearchLog.objects.order_by("-created_at")[:100]
+    context["recent_chats"] = ChatLog.objects.order_by("-created_at")[:20]
+    return render(request, "directory/admin_dashboard.html", context)
+
 
+@require_GET
+@staff_required
+def admin_dashboard_stats(request):
+    return JsonResponse(_dashboard_stats())
 
-def _format_duration(seconds):
-    seconds = max(int(seconds), 0)
-    if seconds < 60:
-        return f"{seconds}s"
-    minutes, sec = divmod(seconds, 60)
-    if minutes < 60:
-        return f"{minutes}m {sec}s"
-    hours, minutes = divmod(minutes, 60)
-    if hours < 24:
-        return f"{hours}h {minutes}m"
-    days, hours = divmod(hours, 24)
-    return f"{days}d {hours}h"
+
+KEEP_PATH_REGEX = re.compile(settings.CRAWL_KEEP_PATH_REGEX)
 
 
 @require_POST
@@ -188,6 +150,8 @@ def admin_crawl_resume(request):
     control, _ = CrawlControl.objects.get_or_create(id=1, defaults={"is_paused": False})
     control.is_paused = False
     control.save(update_fields=["is_paused"])
+    from .tasks import supervise_crawl
+    supervise_crawl.delay()
     return redirect("admin_dashboard")
 
 
@@ -209,30 +173,19 @@ def admin_profile_add(request):
     return redirect("admin_dashboard")
 
 
+def _taxonomy_etag(request):
+    version = current_version()
+    return f"taxonomy-{version}" if version is not None else None
+
+
 @require_GET
+@cache_control(no_cache=True)
+@condition(etag_func=_taxonomy_etag)
 def api_filters(request):
     faculty = (request.GET.get("faculty") or "").strip()
     institute = (request.GET.get("institute") or "").strip()
-
-    faculties = list(Faculty.objects.order_by("name").values_list("name", flat=True))
-
-    institutes_qs = Institute.objects.order_by("name")
-    if faculty:
-        institutes_qs = institutes_qs.filter(faculty__name__iexact=faculty)
-    institutes = list(institutes_qs.values_list("name", flat=True))
-
-    departments_qs = Department.objects.order_by("name")
-    if institute:
-        departments_qs = departments_qs.filter(institute__name__iexact=institute)
-    elif faculty:
-        departments_qs = departments_qs.filter(institute__faculty__name__iexact=faculty)
-    departments = list(departments_qs.values_list("name", flat=True))
-
-    return JsonResponse({
-        "faculties": sorted(faculties),
-        "institutes": sorted(institutes),
-        "departments": sorted(departments),
-    })
+    _, snapshot = get_snapshot()
+    return JsonResponse(filter_options(snapshot, faculty=faculty, institute=institute))
 
 
 @require_GET
@@ -246,31 +199,32 @@ def api_search(request):
     offset = max(int(request.GET.get("offset", 0) or 0), 0)
     limit = min(max(int(request.GET.get("limit", 8) or 8), 1), 50)
 
-    chunks = hybrid_search(query, filters=filters, limit=limit, offset=offset)
+    try:
+        chunks = hybrid_search(query, filters=filters, limit=limit, offset=offset)
+    except OpenAIUnavailable:
+        return JsonResponse({"error": "Search is temporarily unavailable"}, status=503)
     results = []
     for chunk in chunks:
-        staff = chunk.staff
+        card = chunk.card
         results.append({
-            "name": staff.name,
-            "title": staff.title,
-            "suffix": staff.suffix,
-            "faculty": staff.faculty.name if staff.faculty else "",
-            "institute": staff.institute.name if staff.institute else "",
-            "department": staff.department.name if staff.department else "",
-            "profile_url": staff.profile_url,
+            "name": card.name,
+            "title": card.title,
+            "suffix": card.suffix,
+            "faculty": card.faculty_name,
+            "institute": card.institute_name,
+            "department": card.department_name,
+            "profile_url": card.profile_url,
             "snippet": chunk.chunk_text[:280],
             "score": float(getattr(chunk, "score", 0.0) or 0.0),
         })
 
-    SearchLog.objects.create(
+    record_search(
+        request,
         query=query,
         filters=filters,
         offset=offset,
         limit=limit,
         results_count=len(results),
-        user=request.user if request.user.is_authenticated else None,
-        ip_address=request.META.get("REMOTE_ADDR"),
-        user_agent=request.META.get("HTTP_USER_AGENT", ""),
         request_meta={
             "path": request.path,
             "query_string": request.META.get("QUERY_STRING", ""),
@@ -280,33 +234,161 @@ def api_search(request):
     return JsonResponse({"results": results})
 
 
+DEPARTMENT_PAGE_SIZE = 50
+DEPARTMENT_PAGE_SIZE_MAX = 200
+DEPARTMENT_CARD_FIELDS = {
+    "name": "name",
+    "title": "title",
+    "suffix": "suffix",
+    "faculty": "faculty__name",
+    "institute": "institute__name",
+    "department": "department__name",
+    "profile_url": "profile_url",
+}
+
+
+def _encode_cursor(row):
+    return base64.urlsafe_b64encode(json.dumps([row["name"], row["profile_url"]]).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    name, profile_url = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return str(name), str(profile_url)
+
+
+def _department_rows(rows, page_size):
+    # Emit the page as it is read from the server-side cursor; the extra row
+    # only tells us whether another page exists.
+    yield '{"results": ['
+    last = None
+    for position, row in enumerate(rows):
+        if position == page_size:
+            yield "], " + json.dumps({"next_cursor": _encode_cursor(last)})[1:]
+            return
+        card = {key: row[field] or "" for key, field in DEPARTMENT_CARD_FIELDS.items()}
+        card.update(snippet="", score=1.0)
+        yield ("," if position else "") + json.dumps(card)
+        last = row
+    yield '], "next_cursor": null}'
+
+
 @require_GET
 def api_department_staff(request):
     department = (request.GET.get("department") or "").strip()
     if not department:
-        return JsonResponse({"results": []})
+        return JsonResponse({"results": [], "next_cursor": None})
+
+    try:
+        page_size = int(request.GET.get("page_size") or DEPARTMENT_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"error": "Invalid page_size"}, status=400)
+    page_size = min(max(page_size, 1), DEPARTMENT_PAGE_SIZE_MAX)
+
+    units = resolve_units({"department": department})
+    if units is None:
+        return JsonResponse({"results": [], "next_cursor": None})
+
+    staff_qs = StaffProfile.objects.filter(department_id__in=units["department"])
+    cursor = (request.GET.get("cursor") or "").strip()
+    if cursor:
+        try:
+            name, profile_url = _decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return JsonResponse({"error": "Invalid cursor"}, status=400)
+        staff_qs = staff_qs.filter(Q(name__gt=name) | Q(name=name, profile_url__gt=profile_url))
+
+    rows = staff_qs.order_by("name", "profile_url").values(*DEPARTMENT_CARD_FIELDS.values())[:page_size + 1]
+    return StreamingHttpResponse(
+        _department_rows(rows.iterator(chunk_size=page_size + 1), page_size),
+        content_type="application/json",
+    )
 
-    staff_qs = StaffProfile.objects.select_related(
-        "faculty", "institute", "department"
-    ).filter(
-        department__name__iexact=department
-    ).order_by("name", "profile_url")
 
-    results = []
-    for staff in staff_qs:
-        results.append({
-            "name": staff.name,
-            "title": staff.title,
-            "suffix": staff.suffix,
-            "faculty": staff.faculty.name if staff.faculty else "",
-            "institute": staff.institute.name if staff.institute else "",
-            "department": staff.department.name if staff.department else "",
-            "profile_url": staff.profile_url,
-            "snippet": "",
-            "score": 1.0,
+def _chat_context(chunks):
+    context_blocks = []
+    sources = []
+    for chunk in chunks:
+        card = chunk.card
+        context_blocks.append(
+            f"Name: {card.name}\nTitle: {card.title}\nFaculty: {card.faculty_name}\n"
+            f"Institute: {card.institute_name}\nDepartment: {card.department_name}\n"
+            f"Profile URL: {card.profile_url}\nContent: {chunk.chunk_text}"
+        )
+        sources.append({
+            "name": card.name,
+            "profile_url": card.profile_url,
         })
+    return context_blocks, sources
+
+
+def _mentioned_people(summary, sources):
+    """The retrieved people a streamed summary names, in the shape of the JSON answer's people list."""
+    text = summary.lower()
+    people = []
+    seen = set()
+    for source in sources:
+        name = (source.get("name") or "").strip()
+        if name and name.lower() in text and source["profile_url"] not in seen:
+            seen.add(source["profile_url"])
+            people.append({"name": name, "profile_url": source["profile_url"]})
+    return people
+
+
+def _log_chat(request, question, filters, response_payload, sources, **meta):
+    record_chat(
+        request,
+        question=question,
+        filters=filters,
+        response=response_payload,
+        sources=sources,
+        request_meta={"path": request.path, **meta},
+    )
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _stream_cached_chat(response_payload):
+    def events():
+        yield _sse("sources", {"sources": response_payload["sources"]})
+        yield _sse("token", {"text": response_payload["summary"]})
+        yield _sse("done", response_payload)
+
+    return _sse_response(events())
 
-    return JsonResponse({"results": results})
+
+def _sse_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _stream_chat(request, question, filters, context_blocks, sources, cache_key):
+    def events():
+        yield _sse("sources", {"sources": sources})
+        parts = []
+        completed = False
+        try:
+            client = get_openai_client()
+            for text in client.stream_chat_with_context(question, context_blocks):
+                parts.append(text)
+                yield _sse("token", {"text": text})
+            completed = True
+        except Exception:
+            yield _sse("error", {"error": "The answer could not be completed."})
+        finally:
+            summary = "".join(parts).strip()
+            # Plain text carries no people list, so build it from the sources the summary names.
+            people = _mentioned_people(summary, sources)
+            response_payload = {"summary": summary, "people": people, "sources": sources}
+            _log_chat(request, question, filters, response_payload, sources, stream=True, completed=completed, cache="miss")
+        if completed:
+            set_chat_answer(cache_key, response_payload)
+            yield _sse("done", response_payload)
+
+    return _sse_response(events())
 
 
 @csrf_exempt
@@ -319,52 +401,39 @@ def api_chat(request):
 
     question = (payload.get("question") or "").strip()
     filters = payload.get("filters") or {}
+    stream = bool(payload.get("stream")) or "text/event-stream" in request.META.get("HTTP_ACCEPT", "")
 
     if not question:
         return JsonResponse({"error": "Question is required"}, status=400)
 
-    chunks = hybrid_search(question, filters=filters, limit=8)
+    try:
+        chunks = hybrid_search(question, filters=filters, limit=8)
+    except OpenAIUnavailable:
+        return JsonResponse({"error": "Chat is temporarily unavailable"}, status=503)
     if not chunks:
         response_payload = {"summary": "I cannot find that in the staff profiles.", "people": [], "sources": []}
-        ChatLog.objects.create(
-            question=question,
-            filters=filters,
-            response=response_payload,
-            sources=[],
-            user=request.user if request.user.is_authenticated else None,
-            ip_address=request.META.get("REMOTE_ADDR"),
-            user_agent=request.META.get("HTTP_USER_AGENT", ""),
-            request_meta={"path": request.path},
-        )
+        _log_chat(request, question, filters, response_payload, [])
         return JsonResponse(response_payload)
 
-    context_blocks = []
-    sources = []
-    for chunk in chunks:
-        staff = chunk.staff
-        context_blocks.append(
-            f"Name: {staff.name}\nTitle: {staff.title}\nFaculty: {staff.faculty.name if staff.faculty else ''}\n"
-            f"Institute: {staff.institute.name if staff.institute else ''}\nDepartment: {staff.department.name if staff.department else ''}\n"
-            f"Profile URL: {staff.profile_url}\nContent: {chunk.chunk_text}"
-        )
-        sources.append({
-            "name": staff.name,
-            "profile_url": staff.profile_url,
-        })
+    cache_key = chat_answer_key(question, filters, chunks, mode="stream" if stream else "json")
+    cached = get_chat_answer(cache_key)
+    if cached is not None:
+        _log_chat(request, question, filters, cached, cached.get("sources", []), stream=stream, cache="hit")
+        if stream:
+            return _stream_cached_chat(cached)
+        return JsonResponse(cached)
 
-    client = OpenAIClient()
-    answer = client.chat_with_context(question, context_blocks)
+    context_blocks, sources = _chat_context(chunks)
+    if stream:
+        return _stream_chat(request, question, filters, context_blocks, sources, cache_key)
+
+    try:
+        answer = get_openai_client().chat_with_context(question, context_blocks)
+    except OpenAIUnavailable:
+        return JsonResponse({"error": "Chat is temporarily unavailable"}, status=503)
     summary = (answer or {}).get("summary", "")
     people = (answer or {}).get("people", []) or []
     response_payload = {"summary": summary, "people": people, "sources": sources}
-    ChatLog.objects.create(
-        question=question,
-        filters=filters,
-        response=response_payload,
-        sources=sources,
-        user=request.user if request.user.is_authenticated else None,
-        ip_address=request.META.get("REMOTE_ADDR"),
-        user_agent=request.META.get("HTTP_USER_AGENT", ""),
-        request_meta={"path": request.path},
-    )
+    set_chat_answer(cache_key, response_payload)
+    _log_chat(request, question, filters, response_payload, sources, cache="miss")
     return JsonResponse(response_payload)
@@ -102,23 +102,109 @@ LOGOUT_REDIRECT_URL = "/"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_EMBED_MODEL = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
 OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "100000"))
+EMBED_BATCH_MAX_ITEMS = int(os.getenv("EMBED_BATCH_MAX_ITEMS", "512"))
+EMBED_BATCH_INTERVAL = int(os.getenv("EMBED_BATCH_INTERVAL", "60"))
+# How long a claimed batch is reserved for one worker; must outlast an embeddings call and its retries.
+EMBED_CLAIM_SECONDS = int(os.getenv("EMBED_CLAIM_SECONDS", "300"))
+
+# Search
+SEARCH_VECTOR_CANDIDATES = int(os.getenv("SEARCH_VECTOR_CANDIDATES", "100"))
+SEARCH_TEXT_CANDIDATES = int(os.getenv("SEARCH_TEXT_CANDIDATES", "100"))
+SEARCH_FUSION = os.getenv("SEARCH_FUSION", "rrf")
+SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))
+SEARCH_VECTOR_WEIGHT = float(os.getenv("SEARCH_VECTOR_WEIGHT", "0.6"))
+SEARCH_TEXT_WEIGHT = float(os.getenv("SEARCH_TEXT_WEIGHT", "0.4"))
+SEARCH_HNSW_EF_SEARCH = int(os.getenv("SEARCH_HNSW_EF_SEARCH", "100"))
+# off | strict_order | relaxed_order (pgvector >= 0.8)
+SEARCH_HNSW_ITERATIVE_SCAN = os.getenv("SEARCH_HNSW_ITERATIVE_SCAN", "relaxed_order")
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "1024"))
+QUERY_EMBED_CACHE_TTL = int(os.getenv("QUERY_EMBED_CACHE_TTL", str(60 * 60 * 24 * 7)))
+QUERY_EMBED_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_EMBED_CACHE_MAX_ENTRIES", "50000"))
+CHAT_ANSWER_CACHE_TTL = int(os.getenv("CHAT_ANSWER_CACHE_TTL", str(60 * 60 * 24)))
+TAXONOMY_CACHE_TTL = int(os.getenv("TAXONOMY_CACHE_TTL", str(60 * 60 * 24)))
+
+# Analytics
+ANALYTICS_BUFFER_MAX = int(os.getenv("ANALYTICS_BUFFER_MAX", "100000"))
+ANALYTICS_FLUSH_BATCH = int(os.getenv("ANALYTICS_FLUSH_BATCH", "500"))
+ANALYTICS_FLUSH_INTERVAL = int(os.getenv("ANALYTICS_FLUSH_INTERVAL", "10"))
+DASHBOARD_STATS_TTL = int(os.getenv("DASHBOARD_STATS_TTL", "30"))
 
 # Crawler
 CRAWL_SEED_URL = os.getenv("CRAWL_SEED_URL", "https://liverpool.ac.uk/")
 CRAWL_SEED_URLS = [u.strip() for u in os.getenv("CRAWL_SEED_URLS", "").split(",") if u.strip()]
 CRAWL_RATE_LIMIT = float(os.getenv("CRAWL_RATE_LIMIT", "1.0"))
+CRAWL_RATE_BURST = int(os.getenv("CRAWL_RATE_BURST", "1"))
+# How far ahead a worker may book a host's request slots; must stay well under CRAWL_LEASE_SECONDS.
+CRAWL_RESERVE_HORIZON = float(os.getenv("CRAWL_RESERVE_HORIZON", "120"))
 CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "6"))
 CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+CRAWL_CONCURRENCY_MIN = int(os.getenv("CRAWL_CONCURRENCY_MIN", "1"))
+CRAWL_CONCURRENCY_MAX = int(os.getenv("CRAWL_CONCURRENCY_MAX", "16"))
+CRAWL_LATENCY_TARGET = float(os.getenv("CRAWL_LATENCY_TARGET", "2.0"))
+CRAWL_ERROR_RATE_MAX = float(os.getenv("CRAWL_ERROR_RATE_MAX", "0.1"))
+CRAWL_SUPERVISOR_INTERVAL = int(os.getenv("CRAWL_SUPERVISOR_INTERVAL", "30"))
+CRAWL_SUPERVISOR_MIN_SAMPLES = int(os.getenv("CRAWL_SUPERVISOR_MIN_SAMPLES", "20"))
+CRAWL_BATCH_SIZE = int(os.getenv("CRAWL_BATCH_SIZE", "20"))
+CRAWL_ASYNC_CONCURRENCY = int(os.getenv("CRAWL_ASYNC_CONCURRENCY", "200"))
+CRAWL_ASYNC_PARSE_PROCESSES = int(os.getenv("CRAWL_ASYNC_PARSE_PROCESSES", str(os.cpu_count() or 2)))
+CRAWL_SEEN_URL_CACHE_SIZE = int(os.getenv("CRAWL_SEEN_URL_CACHE_SIZE", "100000"))
+CRAWL_RECRAWL_DEFAULT_INTERVAL = int(os.getenv("CRAWL_RECRAWL_DEFAULT_INTERVAL", str(60 * 60 * 24 * 7)))
+CRAWL_RECRAWL_MIN_INTERVAL = int(os.getenv("CRAWL_RECRAWL_MIN_INTERVAL", str(60 * 60 * 24)))
+CRAWL_RECRAWL_MAX_INTERVAL = int(os.getenv("CRAWL_RECRAWL_MAX_INTERVAL", str(60 * 60 * 24 * 90)))
+# How often URLs due for a recrawl are queued; keep it well under CRAWL_RECRAWL_MIN_INTERVAL.
+CRAWL_RECRAWL_CHECK_INTERVAL = int(os.getenv("CRAWL_RECRAWL_CHECK_INTERVAL", str(60 * 60)))
+CRAWL_PROFILE_PRIORITY = int(os.getenv("CRAWL_PROFILE_PRIORITY", "5"))
+CRAWL_LEASE_SECONDS = int(os.getenv("CRAWL_LEASE_SECONDS", "600"))
+CRAWL_LEASE_REAP_INTERVAL = int(os.getenv("CRAWL_LEASE_REAP_INTERVAL", "60"))
+# "database" claims from the CrawlUrl table; "redis" keeps the queue in Redis sorted sets.
+CRAWL_FRONTIER = os.getenv("CRAWL_FRONTIER", "database")
+# A chain's slot heartbeat covers one step (a couple of batches at the latency target); each
+# reschedule adds its countdown on top, so a dead chain's slot frees up within about a minute.
+CRAWL_SLOT_TTL = int(os.getenv("CRAWL_SLOT_TTL", str(int(2 * CRAWL_BATCH_SIZE * CRAWL_LATENCY_TARGET))))
+CRAWL_SITEMAP_DISCOVERY = os.getenv("CRAWL_SITEMAP_DISCOVERY", "1") == "1"
+CRAWL_SITEMAP_URLS = [u.strip() for u in os.getenv("CRAWL_SITEMAP_URLS", "").split(",") if u.strip()]
 CRAWL_ALLOWLIST_DOMAIN = os.getenv("CRAWL_ALLOWLIST_DOMAIN", "liverpool.ac.uk")
 CRAWL_KEEP_PATH_REGEX = os.getenv("CRAWL_KEEP_PATH_REGEX", r"^/people/[^/]+/?$")
+PAGE_STORE_GC_GRACE = int(os.getenv("PAGE_STORE_GC_GRACE", str(60 * 60 * 24)))
 
 # Celery
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+}
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_BEAT_SCHEDULE = {
     "weekly-crawl": {
         "task": "directory.tasks.run_weekly_crawl",
         "schedule": 60 * 60 * 24 * 7,
-    }
+    },
+    "requeue-due-crawl-urls": {
+        "task": "directory.tasks.requeue_due_crawl_urls",
+        "schedule": CRAWL_RECRAWL_CHECK_INTERVAL,
+    },
+    "embed-pending-chunks": {
+        "task": "directory.tasks.embed_pending_chunks",
+        "schedule": EMBED_BATCH_INTERVAL,
+    },
+    "flush-analytics": {
+        "task": "directory.tasks.flush_analytics",
+        "schedule": ANALYTICS_FLUSH_INTERVAL,
+    },
+    "supervise-crawl": {
+        "task": "directory.tasks.supervise_crawl",
+        "schedule": CRAWL_SUPERVISOR_INTERVAL,
+    },
+    "reap-crawl-leases": {
+        "task": "directory.tasks.reap_crawl_leases",
+        "schedule": CRAWL_LEASE_REAP_INTERVAL,
+    },
+    "page-store-gc": {
+        "task": "directory.tasks.collect_page_garbage",
+        "schedule": 60 * 60 * 24,
+    },
 }